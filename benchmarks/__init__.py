@@ -0,0 +1,6 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+"""Benchmarks of code that has to scale with the size of a mailbox."""
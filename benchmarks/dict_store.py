@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+"""Benchmark lookups and removals in `store.DictStore`.
+
+Run from the repository root, where `openemail` and its dependencies can be imported:
+
+    python3 -m benchmarks.dict_store
+"""
+
+import sys
+from collections.abc import Callable
+from random import Random
+from time import perf_counter
+
+from gi.repository import GObject
+
+from openemail.store import DictStore
+
+SIZES = 10_000, 100_000, 1_000_000
+REMOVALS = 1_000
+COLUMNS = (
+    "items",
+    "get_item",
+    "remove first",
+    "remove last",
+    "remove random",
+    "retain 99%",
+)
+
+_VALUE = GObject.Object()
+_random = Random(0)  # noqa: S311
+
+
+class _Store(DictStore[str, GObject.Object]):
+    default_factory = lambda _: _VALUE  # noqa: E731
+
+    _item_type = GObject.Object
+
+    async def _update(self): ...
+
+
+def _filled(n: int) -> tuple[_Store, list[str]]:
+    store, keys = _Store(), [f"host {index:07}" for index in range(n)]
+    for key in keys:
+        store.add(key)
+
+    return store, keys
+
+
+def _time(func: Callable[[], object]) -> float:
+    start = perf_counter()
+    func()
+    return perf_counter() - start
+
+
+def _lookups(store: _Store, n: int) -> float:
+    positions = _random.choices(range(n), k=REMOVALS)
+    return _time(lambda: [store.get_item(p) for p in positions]) / REMOVALS
+
+
+def _removals(n: int, pick: Callable[[list[str]], list[str]]) -> float:
+    store, keys = _filled(n)
+    removed = pick(keys)
+    return _time(lambda: [store.remove(key) for key in removed]) / len(removed)
+
+
+def _retain(n: int) -> float:
+    store, keys = _filled(n)
+    kept = set(_random.sample(keys, n - n // 100))
+    return _time(lambda: store.retain(kept))
+
+
+def main():
+    """Print the time taken by each operation at each of `SIZES`."""
+    rows = [COLUMNS]
+
+    for n in SIZES:
+        store, _keys = _filled(n)
+        rows.append((
+            f"{n:,}",
+            f"{_lookups(store, n) * 1e6:.2f}us",
+            f"{_removals(n, lambda k: k[:REMOVALS]) * 1e6:.2f}us",
+            f"{_removals(n, lambda k: k[-REMOVALS:][::-1]) * 1e6:.2f}us",
+            f"{_removals(n, lambda k: _random.sample(k, REMOVALS)) * 1e6:.2f}us",
+            f"{_retain(n) * 1e3:.1f}ms",
+        ))
+
+    for row in rows:
+        sys.stdout.write("  ".join(cell.rjust(14) for cell in row) + "\n")
+
+
+if __name__ == "__main__":
+    main()
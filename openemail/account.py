@@ -13,7 +13,8 @@ import keyring
 import openemail as app
 
 from . import core, store, tasks
-from .core import account, client, model
+from .core import account, client, contacts, messages, model
+from .core import profile as core_profile
 from .core.model import WriteError
 
 
@@ -67,6 +68,10 @@ def register(
 
 def log_out():
     """Remove the user's local account."""
+    # Body downloads run in the UI group and would write to the removed data dir
+    for group in tasks.SYNC, tasks.UI:
+        tasks.cancel(group)
+
     for profile in store.profiles.values():
         profile.set_from_profile(None)
 
@@ -81,9 +86,14 @@ def log_out():
     ):
         data.clear()
 
+    for state in store.unread, store.trashed, store.deleted:
+        state.clear()
+        state.flush()
+
     for key in (
         "address",
         "sync-interval",
+        "sync-bodies",
         "empty-trash-interval",
         "trusted-domains",
         "contact-requests",
@@ -94,6 +104,10 @@ def log_out():
         store.settings.reset(key)
 
     keyring.delete_password(store.secret_service, client.user.address)
+    messages.reset()
+    contacts.reset()
+    store.reset()
+    core_profile.invalidate()
 
     for directory in core.cache_dir, core.data_dir:
         rmtree(directory, ignore_errors=True)
@@ -1,7 +1,20 @@
 """The core Mail/HTTPS client."""
 
+import asyncio
+from collections.abc import Callable, Coroutine
 from os import getenv
 from pathlib import Path
+from typing import Any
 
 data_dir = Path(getenv("XDG_DATA_HOME", Path.home() / ".local" / "share"), "openemail")
 cache_dir = Path(getenv("XDG_CACHE_HOME", Path.home() / ".cache"), "openemail")
+
+# Apps can replace this to supervise tasks created by `create_task()`
+task_factory: Callable[[Coroutine[Any, Any, Any]], asyncio.Task[Any]] = (
+    asyncio.create_task
+)
+
+
+def create_task[T](coro: Coroutine[Any, Any, T]) -> asyncio.Task[T]:
+    """Create a task shared between callers, such as a fetch, using `task_factory`."""
+    return task_factory(coro)
@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from hashlib import sha256
+
+from .model import Address
+
+QUIET_RATIO = 0.25
+MAX_INTERVAL = timedelta(hours=6)
+
+
+@dataclass(slots=True)
+class _Mailbox:
+    digest: str
+    checked: datetime
+    changed: datetime
+    hinted: bool = False
+
+
+class Activity:
+    """Per-mailbox sync state, used to revalidate quiet mailboxes less often.
+
+    A mailbox is due for revalidation once `ratio` of the time it has been quiet for
+    has passed since it was last checked, but at least every `max_interval`.
+    Mailboxes that were never checked or were hinted to have changed are always due.
+    """
+
+    def __init__(
+        self, *, ratio: float = QUIET_RATIO, max_interval: timedelta = MAX_INTERVAL
+    ):
+        self.ratio = ratio
+        self.max_interval = max_interval
+
+        self._mailboxes = dict[tuple[Address, bool], _Mailbox]()
+
+    def due(self, author: Address, *, broadcasts: bool = False) -> bool:
+        """Whether the message IDs of `author` should be fetched again."""
+        if not (mailbox := self._mailboxes.get((author, broadcasts))):
+            return True
+
+        if mailbox.hinted:
+            return True
+
+        now = datetime.now(UTC)
+        quiet = mailbox.checked - mailbox.changed
+        return now - mailbox.checked >= min(quiet * self.ratio, self.max_interval)
+
+    def record(
+        self, author: Address, idents: Iterable[str], *, broadcasts: bool = False
+    ) -> bool:
+        """Record the message IDs of `author` that were just fetched.
+
+        Returns whether they changed since they were last recorded.
+        """
+        now = datetime.now(UTC)
+        digest = sha256("\n".join(sorted(idents)).encode("utf-8")).hexdigest()
+
+        if (mailbox := self._mailboxes.get((author, broadcasts))) and (
+            mailbox.digest == digest
+        ):
+            mailbox.checked = now
+            mailbox.hinted = False
+            return False
+
+        self._mailboxes[(author, broadcasts)] = _Mailbox(digest, now, now)
+        return True
+
+    def hint(self, author: Address, *, broadcasts: bool = False):
+        """Mark the mailbox of `author` as due, for example after a notification."""
+        if mailbox := self._mailboxes.get((author, broadcasts)):
+            mailbox.hinted = True
+
+    def clear(self):
+        """Forget the state of all mailboxes."""
+        self._mailboxes.clear()
@@ -0,0 +1,143 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+import os
+from logging import getLogger
+from pathlib import Path
+from time import time
+from typing import NamedTuple
+
+logger = getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+
+class Stats(NamedTuple):
+    """Metrics of a `DiskCache`."""
+
+    size: int
+    entries: int
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of reads that were found in the cache."""
+        return self.hits / reads if (reads := self.hits + self.misses) else 0
+
+
+class DiskCache:
+    """A directory of cached files, evicted by size, entry count and age.
+
+    Once the cache holds more than `max_size` bytes or `max_entries` files,
+    the least recently used ones are deleted.
+    Files not used in `max_age` seconds are deleted by `prune()`.
+
+    Recency is tracked using the modification time of files,
+    which is updated whenever they are read.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_size: int,
+        max_entries: int,
+        max_age: int = 30 * DAY,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self._entries: dict[str, tuple[int, float]] | None = None
+        self._size = 0
+        self._hits = self._misses = 0
+
+    def read(self, key: str) -> bytes | None:
+        """Read the entry for `key`, or `None` if it is not cached."""
+        try:
+            contents = (path := self.path / key).read_bytes()
+        except OSError:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        self._touch(key, path, len(contents))
+        return contents
+
+    def write(self, key: str, contents: bytes):
+        """Cache `contents` for `key`, evicting other entries if needed."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        (path := self.path / key).write_bytes(contents)
+
+        self._touch(key, path, len(contents))
+        self._evict()
+
+    def remove(self, key: str):
+        """Remove the entry for `key`."""
+        (self.path / key).unlink(missing_ok=True)
+        if (entry := self._load().pop(key, None)) is not None:
+            self._size -= entry[0]
+
+    def prune(self):
+        """Delete entries not used in `self.max_age` seconds."""
+        now = time()
+        for key, (_size, used) in tuple(self._load().items()):
+            if now - used >= self.max_age:
+                self.remove(key)
+
+    def stats(self) -> Stats:
+        """Get the current metrics of `self`."""
+        return Stats(self._size, len(self._load()), self._hits, self._misses)
+
+    def _touch(self, key: str, path: Path, size: int):
+        entries, now = self._load(), time()
+
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            return
+
+        if (previous := entries.get(key)) is not None:
+            self._size -= previous[0]
+
+        # Keep entries ordered by recency
+        entries.pop(key, None)
+        entries[key] = size, now
+        self._size += size
+
+    def _evict(self):
+        entries = self._load()
+        while entries and (
+            (self._size > self.max_size) or (len(entries) > self.max_entries)
+        ):
+            key = next(iter(entries))
+            logger.debug("Evicting %s from %s", key, self.path.name)
+            self.remove(key)
+
+    def _load(self) -> dict[str, tuple[int, float]]:
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = {}
+
+        try:
+            with os.scandir(self.path) as it:
+                found = [
+                    (entry.name, stat.st_size, stat.st_mtime)
+                    for entry in it
+                    if entry.is_file() and (stat := entry.stat())
+                ]
+        except OSError:
+            found = []
+
+        for key, size, used in sorted(found, key=lambda entry: entry[2]):
+            self._entries[key] = size, used
+            self._size += size
+
+        self.prune()
+        self._evict()
+        return self._entries
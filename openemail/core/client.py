@@ -5,6 +5,7 @@
 
 import asyncio
 from collections.abc import Callable
+from http import HTTPStatus
 from http.client import HTTPResponse, InvalidURL
 from logging import getLogger
 from typing import Any
@@ -25,6 +26,10 @@ logger = getLogger(__name__)
 _agents = dict[str, tuple[str, ...]]()
 
 
+class NotModified(Exception):  # noqa: N818
+    """Raised if a conditional request found that the resource did not change."""
+
+
 async def request(
     url: str,
     *,
@@ -34,7 +39,11 @@ async def request(
     data: bytes | None = None,
     max_length: int | None = None,
 ) -> HTTPResponse | None:
-    """Make an HTTPS request, handling errors and authentication."""
+    """Make an HTTPS request, handling errors and authentication.
+
+    Raises `NotModified` if the server responds with 304 Not Modified,
+    which only happens for conditional requests.
+    """
     headers = headers or {}
     headers["User-Agent"] = "Mozilla/5.0"
 
@@ -55,6 +64,13 @@ async def request(
             urlopen, Request(url, method=method, headers=headers, data=data)
         )
     except (InvalidURL, URLError, TimeoutError, ValueError) as error:
+        if isinstance(error, HTTPError) and error.code == HTTPStatus.NOT_MODIFIED:
+            error.close()
+            if on_offline:
+                on_offline(False)
+
+            raise NotModified from error
+
         logger.debug(
             "%s, URL: %s, Method: %s, Auth: %s",
             error,
@@ -3,30 +3,45 @@
 # SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
 # SPDX-FileContributor: kramo
 
+import asyncio
 from base64 import b64encode
+from hashlib import sha256
 from logging import getLogger
 
 from . import client, crypto, model, urls
 from .model import Address, Profile, WriteError
 
+DECRYPT_BATCH = 64
+
 logger = getLogger(__name__)
 
+_contacts = set[tuple[Address, bool]]()
+_validators = dict[str, dict[str, str]]()
+_decrypted = dict[bytes, tuple[Address, bool] | None]()
+
 
 async def fetch() -> set[tuple[Address, bool]]:
     """Fetch `core.user`'s contacts.
 
     Returns their addresses and whether broadcasts should be received from them.
+
+    If the contact list did not change since the last fetch,
+    the previous result is returned without downloading it again.
     """
     logger.debug("Fetching contact list…")
-    addresses = list[tuple[Address, bool]]()
 
     for agent in await client.get_agents(client.user.address):
-        if not (
-            response := await client.request(
+        try:
+            response = await client.request(
                 urls.Home(agent, client.user.address).links,
                 auth=True,
+                headers=dict(_validators.get(agent, {})) if _contacts else None,
             )
-        ):
+        except client.NotModified:
+            logger.debug("Contact list not modified")
+            return set(_contacts)
+
+        if not response:
             continue
 
         with response:
@@ -35,34 +50,31 @@ async def fetch() -> set[tuple[Address, bool]]:
             except UnicodeError:
                 continue
 
-        for line in contents.split("\n"):
-            try:
-                contact = crypto.decrypt_anonymous(
-                    line.strip().split(",")[1].strip(),
-                    client.user.encryption_keys.private,
-                ).decode("utf-8")
-            except (IndexError, ValueError):
-                continue
+            _validators[agent] = {
+                header: value
+                for header, response_header in (
+                    ("If-None-Match", "ETag"),
+                    ("If-Modified-Since", "Last-Modified"),
+                )
+                if (value := response.headers.get(response_header))
+            }
 
-            # For backwards-compatibility with contacts added before 1.0
-            try:
-                addresses.append((Address(contact), True))
-                continue
-            except (ValueError, UnicodeDecodeError):
-                pass
-
-            try:
-                addresses.append((
-                    Address((entry := model.parse_headers(contact))["address"]),
-                    entry.get("broadcasts", "yes").lower() != "no",
-                ))
-            except (KeyError, ValueError):
-                continue
+        contacts = await _parse(contents)
+        _contacts.clear()
+        _contacts.update(contacts)
 
-        break
+        logger.debug("Contact list fetched")
+        return contacts
 
     logger.debug("Contact list fetched")
-    return set(addresses)
+    return set()
+
+
+def reset():
+    """Forget the cached contact list, for example after logging out."""
+    _contacts.clear()
+    _validators.clear()
+    _decrypted.clear()
 
 
 async def new(address: Address, *, receive_broadcasts: bool = True) -> Profile:
@@ -70,7 +82,7 @@ async def new(address: Address, *, receive_broadcasts: bool = True) -> Profile:
 
     Returns `address`'s profile on success.
     """
-    from .profile import fetch
+    from .profile import MAX_AGE, fetch
 
     logger.debug("Adding %s to address book…", address)
 
@@ -88,7 +100,7 @@ async def new(address: Address, *, receive_broadcasts: bool = True) -> Profile:
         logger.exception("Error adding %s to address book: Failed to encrypt", address)
         raise
 
-    if not (profile := await fetch(address)):
+    if not (profile := await fetch(address, max_age=MAX_AGE)):
         logger.error("Failed adding %s to address book: No profile found")
         raise WriteError
 
@@ -122,3 +134,57 @@ async def delete(address: Address):
 
     logger.error("Deleting contact %s failed", address)
     raise WriteError
+
+
+async def _parse(contents: str) -> set[tuple[Address, bool]]:
+    lines = {
+        sha256(line.encode("utf-8")).digest(): line for line in contents.split("\n")
+    }
+    pending = [(key, line) for key, line in lines.items() if key not in _decrypted]
+
+    private_key = client.user.encryption_keys.private
+    batches = [
+        pending[index : index + DECRYPT_BATCH]
+        for index in range(0, len(pending), DECRYPT_BATCH)
+    ]
+
+    decrypted = await asyncio.gather(
+        *(asyncio.to_thread(_decrypt_batch, batch, private_key) for batch in batches)
+    )
+    for batch, results in zip(batches, decrypted, strict=True):
+        _decrypted.update(zip((key for key, _ in batch), results, strict=True))
+
+    # Only keep lines that are still in the list
+    for key in _decrypted.keys() - lines.keys():
+        del _decrypted[key]
+
+    return {contact for key in lines if (contact := _decrypted[key])}
+
+
+def _decrypt_batch(
+    batch: list[tuple[bytes, str]], private_key: crypto.Key
+) -> list[tuple[Address, bool] | None]:
+    return [_decrypt_line(line, private_key) for _, line in batch]
+
+
+def _decrypt_line(line: str, private_key: crypto.Key) -> tuple[Address, bool] | None:
+    try:
+        contact = crypto.decrypt_anonymous(
+            line.strip().split(",")[1].strip(), private_key
+        ).decode("utf-8")
+    except (IndexError, ValueError):
+        return None
+
+    # For backwards-compatibility with contacts added before 1.0
+    try:
+        return Address(contact), True
+    except (ValueError, UnicodeDecodeError):
+        pass
+
+    try:
+        return (
+            Address((entry := model.parse_headers(contact))["address"]),
+            entry.get("broadcasts", "yes").lower() != "no",
+        )
+    except (KeyError, ValueError):
+        return None
@@ -0,0 +1,111 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+import json
+import os
+from datetime import UTC, date, datetime
+from json import JSONDecodeError
+from logging import getLogger
+from pathlib import Path
+
+from .model import MESSAGE_LIFETIME
+
+logger = getLogger(__name__)
+
+
+class Ledger:
+    """An append-only record of IDs, bucketed by day.
+
+    Each bucket is a file in `path` named after the date it was written on,
+    with one ID per line. Buckets older than `lifetime` days are deleted by `prune()`.
+    """
+
+    def __init__(self, path: Path, *, lifetime: int = MESSAGE_LIFETIME):
+        self.path = path
+        self.lifetime = lifetime
+
+        self._buckets: dict[date, set[str]] | None = None
+
+    def __contains__(self, ident: object) -> bool:
+        return any(ident in bucket for bucket in self._load().values())
+
+    def add(self, *idents: str):
+        """Append `idents` to today's bucket.
+
+        The bucket is synced to disk before returning.
+        A crash while writing can only lose the IDs that were being written.
+        """
+        if not (new := tuple(dict.fromkeys(i for i in idents if i not in self))):
+            return
+
+        today = datetime.now(UTC).date()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        with (self.path / today.isoformat()).open("a") as file:
+            file.write("".join(f"{ident}\n" for ident in new))
+            file.flush()
+            os.fsync(file.fileno())
+
+        self._load().setdefault(today, set()).update(new)
+
+    def invalidate(self):
+        """Forget the IDs held in memory, so they are loaded from disk again."""
+        self._buckets = None
+
+    def prune(self):
+        """Delete buckets older than `self.lifetime` days."""
+        today = datetime.now(UTC).date()
+        for day in tuple(buckets := self._load()):
+            if (today - day).days < self.lifetime:
+                continue
+
+            logger.debug("Pruning %s from %s…", day, self.path.name)
+            (self.path / day.isoformat()).unlink(missing_ok=True)
+            del buckets[day]
+
+    def _load(self) -> dict[date, set[str]]:
+        if self._buckets is not None:
+            return self._buckets
+
+        self._buckets = {}
+
+        try:
+            paths = tuple(self.path.iterdir())
+        except FileNotFoundError:
+            paths = ()
+
+        for path in paths:
+            try:
+                day = date.fromisoformat(path.name)
+                contents = path.read_bytes()
+
+                # Drop a trailing partial line left behind by an interrupted write,
+                # so that the next append does not merge it with a new ID
+                if (end := contents.rfind(b"\n") + 1) < len(contents):
+                    os.truncate(path, end)
+
+                idents = contents[:end].decode("utf-8")
+            except (OSError, UnicodeError, ValueError):
+                continue
+
+            self._buckets[day] = set(idents.split("\n")) - {""}
+
+        self._migrate()
+        return self._buckets
+
+    def _migrate(self):
+        legacy_path = self.path.with_suffix(".json")
+
+        try:
+            with legacy_path.open("r") as file:
+                idents = tuple(map(str, json.load(file)))
+        except FileNotFoundError:
+            return
+        except (JSONDecodeError, TypeError, ValueError):
+            idents = ()
+
+        logger.debug("Migrating %s…", legacy_path.name)
+        self.add(*idents)
+        legacy_path.unlink(missing_ok=True)
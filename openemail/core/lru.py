@@ -0,0 +1,64 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+from collections import OrderedDict
+from collections.abc import Callable
+
+
+class LRU[K, V]:
+    """A mapping that evicts its least recently used items once it grows too large.
+
+    The size of each value is measured using `size_of`, which counts items by default.
+    Items are evicted once the total size exceeds `max_size`.
+    """
+
+    def __init__(self, max_size: int, size_of: Callable[[V], int] = lambda _: 1):
+        self.max_size = max_size
+        self.size_of = size_of
+
+        self._items = OrderedDict[K, V]()
+        self._size = 0
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __setitem__(self, key: K, value: V):
+        self.pop(key)
+
+        self._items[key] = value
+        self._size += self.size_of(value)
+
+        while self._size > self.max_size and len(self._items) > 1:
+            _key, evicted = self._items.popitem(last=False)
+            self._size -= self.size_of(evicted)
+
+    @property
+    def size(self) -> int:
+        """The total size of items in `self`."""
+        return self._size
+
+    def get(self, key: K) -> V | None:
+        """Get the value for `key`, marking it as recently used."""
+        try:
+            self._items.move_to_end(key)
+        except KeyError:
+            return None
+
+        return self._items[key]
+
+    def pop(self, key: K) -> V | None:
+        """Remove `key` from `self`, returning its value if it was present."""
+        if (value := self._items.pop(key, None)) is not None:
+            self._size -= self.size_of(value)
+
+        return value
+
+    def clear(self):
+        """Remove all items from `self`."""
+        self._items.clear()
+        self._size = 0
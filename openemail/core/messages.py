@@ -3,17 +3,22 @@
 # SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
 # SPDX-FileContributor: kramo
 
+import asyncio
 import json
 from base64 import b64encode
-from collections.abc import AsyncGenerator, Iterable, Sequence
+from collections import defaultdict
+from collections.abc import AsyncGenerator, Container, Iterable, Sequence
 from datetime import UTC, datetime
 from hashlib import sha256
+from http.client import HTTPResponse
 from itertools import chain
 from json import JSONDecodeError
 from logging import getLogger
 from pathlib import Path
 
-from . import client, crypto, data_dir, model, urls
+from . import client, create_task, crypto, data_dir, model, urls
+from .activity import Activity
+from .ledger import Ledger
 from .model import (
     Address,
     IncomingMessage,
@@ -27,36 +32,96 @@ logger = getLogger(__name__)
 
 _SHORT = 8
 
+_notifications = Ledger(data_dir / "notifications")
+_activity = Activity()
+_body_tasks = dict[str, asyncio.Task[str | None]]()
 
-async def fetch_broadcasts(
-    author: Address, *, exclude: Iterable[str] = ()
-) -> tuple[IncomingMessage, ...]:
-    """Fetch broadcasts by `author`, without messages with IDs in `exclude`."""
+
+def fetch_broadcasts(
+    author: Address, *, exclude: Container[str] = (), bodies: bool = True
+) -> AsyncGenerator[IncomingMessage]:
+    """Fetch broadcasts by `author`, without messages with IDs in `exclude`.
+
+    If `bodies` is `False`, bodies that are not on disk yet are not downloaded.
+    See `fetch_body()`.
+
+    Messages are yielded as they are fetched, see `_fetch()`.
+    """
     logger.debug("Fetching broadcasts from %s…", author)
-    return await _fetch(author, broadcasts=True, exclude=exclude)
+    return _fetch(author, broadcasts=True, exclude=exclude, bodies=bodies)
 
 
-async def fetch_link_messages(
-    author: Address, *, exclude: Iterable[str] = ()
-) -> tuple[IncomingMessage, ...]:
+def fetch_link_messages(
+    author: Address, *, exclude: Container[str] = (), bodies: bool = True
+) -> AsyncGenerator[IncomingMessage]:
     """Fetch messages by `author`, addressed to `core.user`.
 
     `exclude` are Message-Ids to ignore.
+
+    If `bodies` is `False`, bodies that are not on disk yet are not downloaded.
+    See `fetch_body()`.
+
+    Messages are yielded as they are fetched, see `_fetch()`.
     """
     logger.debug("Fetching link messages messages from %s…", author)
-    return await _fetch(author, exclude=exclude)
+    return _fetch(author, exclude=exclude, bodies=bodies)
+
 
+def fetch_home(
+    exclude: Container[str] = (), *, bodies: bool = True
+) -> AsyncGenerator[tuple[IncomingMessage, bool]]:
+    """Fetch messages sent by `core.user`, for both Sent and the outbox.
 
-async def fetch_outbox() -> tuple[IncomingMessage, ...]:
-    """Fetch messages by `core.user` that are currently available to be retrieved."""
-    logger.debug("Fetching outbox…")
-    return await _fetch(client.user.address, remote_only=True)
+    Yields each message along with whether it is still available to be retrieved.
 
+    Messages with IDs in `exclude` are only fetched while they are still available,
+    so they can be shown in the outbox.
 
-async def fetch_sent(exclude: Iterable[str] = ()) -> tuple[IncomingMessage, ...]:
-    """Fetch messages sent by `core.user`."""
+    If `bodies` is `False`, bodies that are not on disk yet are not downloaded.
+    See `fetch_body()`.
+
+    Messages are yielded as they are fetched, see `_stream()`.
+    """
     logger.debug("Fetching sent messages…")
-    return await _fetch(client.user.address, exclude=exclude)
+    return _stream(
+        client.user.address,
+        exclude=exclude,
+        exclude_remote=False,
+        bodies=bodies,
+    )
+
+
+def load_body(msg: IncomingMessage, /) -> str | None:
+    """Load the body of `msg` from disk.
+
+    Returns `None` if it has not been downloaded yet. See `fetch_body()`.
+    Note that the body is not kept in `msg.body`, callers should cache it themselves.
+    """
+    try:
+        contents = _message_path(
+            msg.author, msg.ident, broadcast=msg.is_broadcast
+        ).read_bytes()
+    except FileNotFoundError:
+        return None
+
+    return _with_parts(msg, _decode_body(msg, contents))
+
+
+async def fetch_body(msg: IncomingMessage, /) -> str | None:
+    """Load the body of `msg` from disk, downloading it if it was fetched without one.
+
+    Returns the body or `None` if it could not be fetched.
+    Concurrent calls for the same message share a single download,
+    which is not cancelled along with any one of them.
+    """
+    if (body := await asyncio.to_thread(load_body, msg)) is not None:
+        return body
+
+    if not (task := _body_tasks.get(msg.ident)):
+        task = _body_tasks[msg.ident] = create_task(_fetch_body(msg))
+        task.add_done_callback(lambda _: _body_tasks.pop(msg.ident, None))
+
+    return await asyncio.shield(task)
 
 
 async def download_attachment(parts: Iterable[Message]) -> bytes | None:
@@ -90,11 +155,14 @@ async def download_attachment(parts: Iterable[Message]) -> bytes | None:
 
 async def notify_readers(readers: Iterable[Address]):
     """Notify `readers` of a new message."""
-    from .profile import fetch
+    from .profile import MAX_AGE, fetch
 
     logger.debug("Notifying readers…")
     for reader in readers:
-        if not ((profile := await fetch(reader)) and (key := profile.encryption_key)):
+        if not (
+            (profile := await fetch(reader, max_age=MAX_AGE))
+            and (key := profile.encryption_key)
+        ):
             logger.warning(
                 "Failed notifying %s: Could not fetch profile",
                 reader,
@@ -153,24 +221,31 @@ async def fetch_notifications() -> AsyncGenerator[Notification]:
         break
 
     if contents:
-        notifications_path = data_dir / "notifications.json"
+        _notifications.prune()
 
-        try:
-            with notifications_path.open("r") as file:
-                notifications = set(json.load(file))
-        except (FileNotFoundError, JSONDecodeError, ValueError):
-            notifications = set[str]()
+        notifiers = await asyncio.to_thread(_parse_notifications, contents)
+        fingerprints = await asyncio.gather(
+            *(
+                _fingerprints(notifier, {n.fp for n in notifications})
+                for notifier, notifications in notifiers.items()
+            )
+        )
 
-        for notification in contents.split("\n"):
-            if not (stripped := notification.strip()):
-                continue
+        idents = list[str]()
+        for notifications, fps in zip(notifiers.values(), fingerprints, strict=True):
+            for notification in notifications:
+                if notification.fp not in fps:
+                    logger.debug(
+                        "Fingerprint mismatch for notification %s",
+                        notification.ident[:_SHORT],
+                    )
+                    continue
 
-            if processed := await _process_notification(stripped, notifications):
-                yield processed
+                idents.append(notification.ident)
+                _activity.hint(notification.notifier)
+                yield notification
 
-        notifications_path.parent.mkdir(parents=True, exist_ok=True)
-        with notifications_path.open("w") as file:
-            json.dump(tuple(notifications), file)
+        _notifications.add(*idents)
 
     logger.debug("Notifications fetched")
 
@@ -228,6 +303,12 @@ async def delete(ident: str):
     raise WriteError
 
 
+def reset():
+    """Forget the sync state of all mailboxes, for example after logging out."""
+    _activity.clear()
+    _notifications.invalidate()
+
+
 def remove_from_disk(msg: Message, /):
     """Remove `msg` from disk if it has been downloaded before.
 
@@ -242,57 +323,80 @@ def remove_from_disk(msg: Message, /):
     logger.debug("Removed message %s from disk", msg.ident[:_SHORT])
 
 
-async def _process_notification(
-    notification: str, notifications: set[str]
-) -> Notification | None:
-    from .profile import fetch
+def _parse_notifications(contents: str) -> dict[Address, list[Notification]]:
+    """Decrypt and group new notifications in `contents` by their notifier."""
+    notifiers = defaultdict[Address, list[Notification]](list)
+    seen = set[str]()
 
-    try:
-        ident, link, signing_key_fp, encrypted_notifier = (
-            part.strip() for part in notification.split(",", 4)
-        )
-    except IndexError:
-        logger.debug("Invalid notification: %s", notification)
-        return None
+    for notification in contents.split("\n"):
+        if not (stripped := notification.strip()):
+            continue
 
-    if ident in notifications:
-        return None
+        try:
+            ident, link, signing_key_fp, encrypted_notifier = (
+                part.strip() for part in stripped.split(",", 4)
+            )
+        except ValueError:
+            logger.debug("Invalid notification: %s", stripped)
+            continue
 
-    try:
-        notifier = Address(
-            crypto.decrypt_anonymous(
-                encrypted_notifier,
-                client.user.encryption_keys.private,
-            ).decode("utf-8")
+        if (ident in seen) or (ident in _notifications):
+            continue
+
+        try:
+            notifier = Address(
+                crypto.decrypt_anonymous(
+                    encrypted_notifier,
+                    client.user.encryption_keys.private,
+                ).decode("utf-8")
+            )
+        except ValueError:
+            logger.debug("Unable to decrypt notification: %s", stripped)
+            continue
+
+        seen.add(ident)
+        notifiers[notifier].append(
+            Notification(
+                ident,
+                datetime.now(UTC),
+                link,
+                notifier,
+                signing_key_fp,
+            )
         )
-    except ValueError:
-        logger.debug("Unable to decrypt notification: %s", notification)
-        return None
+
+    return notifiers
+
+
+async def _fingerprints(notifier: Address, claimed: set[str]) -> set[str]:
+    """Get the signing key fingerprints of `notifier` that notifications may use.
+
+    The cached profile is used if it accounts for all `claimed` fingerprints,
+    otherwise the profile is fetched.
+    """
+    from .profile import cached, fetch
+
+    if (profile := cached(notifier)) and (
+        claimed <= (fingerprints := _profile_fingerprints(profile))
+    ):
+        return fingerprints
 
     if not (profile := await fetch(notifier)):
         logger.error(
-            "Failed to fetch notification: Could not fetch profile for %s",
+            "Failed to fetch notifications: Could not fetch profile for %s",
             notifier,
         )
-        return None
+        return set()
 
-    if signing_key_fp not in {
-        crypto.fingerprint(profile.signing_key),
-        crypto.fingerprint(profile.last_signing_key)
-        if profile.last_signing_key
-        else None,
-    }:
-        logger.debug("Fingerprint mismatch for notification: %s", notification)
-        return None
+    return _profile_fingerprints(profile)
 
-    notifications.add(ident)
-    return Notification(
-        ident,
-        datetime.now(UTC),
-        link,
-        notifier,
-        signing_key_fp,
-    )
+
+def _profile_fingerprints(profile: model.Profile) -> set[str]:
+    return {
+        crypto.fingerprint(key)
+        for key in (profile.signing_key, profile.last_signing_key)
+        if key
+    }
 
 
 async def _fetch_envelope(
@@ -301,8 +405,15 @@ async def _fetch_envelope(
     author: Address,
     *,
     broadcast: bool = False,
-    exclude: Iterable[str] = (),
-) -> tuple[dict[str, str] | None, bool]:
+    exclude: Container[str] = (),
+    method: str = "GET",
+) -> tuple[dict[str, str] | None, HTTPResponse | None]:
+    """Load the envelope of the message at `url` from disk or fetch it.
+
+    If the envelope is not on disk, it is taken from the headers of a request
+    using `method`. The response is returned unread along with the headers,
+    so the body of a GET request can be read without another round trip.
+    """
     logger.debug("Fetching envelope %s…", ident[:_SHORT])
 
     envelopes_dir = data_dir / "envelopes" / author.host_part / author.local_part
@@ -314,7 +425,7 @@ async def _fetch_envelope(
     if ident in exclude:
         logger.debug("Removing deleted envelope %s…", ident[:_SHORT])
         envelope_path.unlink(missing_ok=True)
-        return None, False
+        return None, None
 
     try:
         with envelope_path.open("r") as file:
@@ -322,16 +433,11 @@ async def _fetch_envelope(
 
     except (FileNotFoundError, JSONDecodeError, ValueError):
         if not (
-            response := await client.request(
-                url,
-                auth=not broadcast,
-                method="HEAD",
-            )
+            response := await client.request(url, auth=not broadcast, method=method)
         ):
             logger.exception("Fetching envelope %s failed", ident[:_SHORT])
-            return None, False
+            return None, None
 
-        new = True
         headers = dict(response.getheaders())
 
         envelope_path.parent.mkdir(parents=True, exist_ok=True)
@@ -339,10 +445,10 @@ async def _fetch_envelope(
             json.dump(headers, file)
 
     else:
-        new = False
+        response = None
 
     logger.debug("Fetched envelope %s", ident[:_SHORT])
-    return headers, new
+    return headers, response
 
 
 async def _fetch_from_agent(
@@ -351,81 +457,149 @@ async def _fetch_from_agent(
     ident: str,
     *,
     broadcast: bool = False,
-    exclude: Iterable[str] = (),
+    exclude: Container[str] = (),
+    bodies: bool = True,
 ) -> IncomingMessage | None:
     logger.debug("Fetching message %s…", ident[:_SHORT])
 
-    messages_dir = data_dir / "messages" / author.host_part / author.local_part
-    if broadcast:
-        messages_dir /= "broadcasts"
-
-    message_path = messages_dir / ident
+    message_path = _message_path(author, ident, broadcast=broadcast)
 
     if ident in exclude:
         logger.debug("Removing deleted message %s…", ident[:_SHORT])
         message_path.unlink(missing_ok=True)
 
-    envelope, new = await _fetch_envelope(
+    # Only request the body along with the envelope if it is needed
+    method = "GET" if bodies and (not message_path.is_file()) else "HEAD"
+    envelope, response = await _fetch_envelope(
         url,
         ident,
         author,
         broadcast=broadcast,
         exclude=exclude,
+        method=method,
     )
     if not envelope:
         return None
 
     try:
         msg = IncomingMessage(
-            ident, author, envelope, client.user.encryption_keys.private, new=new
+            ident,
+            author,
+            envelope,
+            client.user.encryption_keys.private,
+            new=response is not None,
         )
     except ValueError:
         logger.exception("Constructing message %s failed", ident[:_SHORT])
+        if response:
+            response.close()
+
         return None
 
+    msg.url = url
+
+    if response and (msg.is_child or method == "HEAD"):
+        # Attachments are only downloaded once they are opened
+        response.close()
+        response = None
+
     if msg.is_child:
         msg.attachment_url = url
 
         logger.debug("Fetched message %s", ident[:_SHORT])
         return msg
 
-    try:
-        contents = message_path.read_bytes()
-    except FileNotFoundError:
-        if not (response := await client.request(url, auth=not broadcast)):
-            logger.exception(
+    if not (response or message_path.is_file()):
+        if not bodies:
+            logger.debug("Fetched envelope of message %s", ident[:_SHORT])
+            return msg
+
+        response = await client.request(url, auth=not broadcast)
+
+        if not response:
+            logger.error(
                 "Fetching message %s failed: Failed fetching body",
                 ident[:_SHORT],
             )
             return None
 
+    if response:
         with response:
             contents = response.read()
 
         message_path.parent.mkdir(parents=True, exist_ok=True)
         message_path.write_bytes(contents)
 
+    else:
+        contents = message_path.read_bytes()
+
+    # Bodies are decoded to verify them, but only kept on disk. See `load_body()`.
+    if _decode_body(msg, contents) is None:
+        return None
+
+    msg.stored = True
+
+    logger.debug("Fetched message %s", ident[:_SHORT])
+    return msg
+
+
+async def _fetch_body(msg: IncomingMessage) -> str | None:
+    logger.debug("Fetching body of message %s…", msg.ident[:_SHORT])
+
+    if not (
+        msg.url
+        and (response := await client.request(msg.url, auth=not msg.is_broadcast))
+    ):
+        logger.error("Fetching body of message %s failed", msg.ident[:_SHORT])
+        return None
+
+    with response:
+        contents = response.read()
+
+    if (body := _decode_body(msg, contents)) is None:
+        return None
+
+    message_path = _message_path(msg.author, msg.ident, broadcast=msg.is_broadcast)
+    message_path.parent.mkdir(parents=True, exist_ok=True)
+    message_path.write_bytes(contents)
+    msg.stored = True
+
+    logger.debug("Fetched body of message %s", msg.ident[:_SHORT])
+    return _with_parts(msg, body)
+
+
+def _decode_body(msg: IncomingMessage, contents: bytes) -> str | None:
     if (not msg.is_broadcast) and msg.access_key:
         try:
             contents = crypto.decrypt_xchacha20poly1305(contents, msg.access_key)
         except ValueError:
             logger.exception(
                 "Fetching message %s failed: Failed to decrypt body",
-                ident[:_SHORT],
+                msg.ident[:_SHORT],
             )
             return None
 
     try:
-        msg.body = contents.decode("utf-8")
+        return contents.decode("utf-8")
     except UnicodeError:
         logger.exception(
             "Fetching message %s failed: Failed to decode body",
-            ident[:_SHORT],
+            msg.ident[:_SHORT],
         )
         return None
 
-    logger.debug("Fetched message %s", ident[:_SHORT])
-    return msg
+
+def _with_parts(msg: IncomingMessage, body: str | None) -> str | None:
+    # `msg.body` only holds the bodies of parts, see `reconstruct_from_children()`
+    return None if body is None else body + (msg.body or "")
+
+
+def _message_path(author: Address, ident: str, *, broadcast: bool = False) -> Path:
+    path = data_dir / "messages" / author.host_part / author.local_part
+    if broadcast:
+        path /= "broadcasts"
+
+    return path / ident
 
 
 async def _fetch_ids(
@@ -434,6 +608,9 @@ async def _fetch_ids(
     """Fetch link or broadcast message IDs by `author`, addressed to `core.user`.
 
     Returns a touple of two sets: local and remote IDs.
+
+    Mailboxes of other users that are not due for revalidation are not fetched,
+    only their local IDs are returned. See `Activity`.
     """
     logger.debug("Fetching message IDs from %s…", author)
 
@@ -446,6 +623,12 @@ async def _fetch_ids(
     except FileNotFoundError:
         local_ids = set[str]()
 
+    # The user's own mailbox is always fetched, as it is also used for the outbox
+    own = author == client.user.address
+    if not (own or _activity.due(author, broadcasts=broadcasts)):
+        logger.debug("Skipping unchanged message IDs from %s", author)
+        return local_ids, set()
+
     for agent in await client.get_agents(client.user.address):
         if not (
             response := await client.request(
@@ -469,11 +652,16 @@ async def _fetch_ids(
             except UnicodeError:
                 continue
 
-        logger.debug("Fetched message IDs from %s", author)
-        return local_ids, {
+        remote_ids = {
             stripped for line in contents.split("\n") if (stripped := line.strip())
         }
 
+        if not own:
+            _activity.record(author, remote_ids, broadcasts=broadcasts)
+
+        logger.debug("Fetched message IDs from %s", author)
+        return local_ids, remote_ids
+
     logger.warning("Could not fetch message IDs from %s", author)
     return local_ids, set()
 
@@ -482,12 +670,43 @@ async def _fetch(
     author: Address,
     *,
     broadcasts: bool = False,
-    remote_only: bool = False,
-    exclude: Iterable[str] = (),
-) -> tuple[IncomingMessage, ...]:
-    messages = dict[str, IncomingMessage]()
+    exclude: Container[str] = (),
+    bodies: bool = True,
+) -> AsyncGenerator[IncomingMessage]:
+    """Fetch messages by `author`, yielding each one as soon as it is complete.
+
+    See `_stream()`.
+    """
+    async for msg, _remote in _stream(
+        author, broadcasts=broadcasts, exclude=exclude, bodies=bodies
+    ):
+        yield msg
+
+
+async def _stream(
+    author: Address,
+    *,
+    broadcasts: bool = False,
+    exclude: Container[str] = (),
+    exclude_remote: bool = True,
+    bodies: bool = True,
+) -> AsyncGenerator[tuple[IncomingMessage, bool]]:
+    """Fetch messages by `author`, yielding each one as soon as it is complete.
+
+    Each message is yielded along with whether it is still available remotely.
+    If `exclude_remote` is `False`, `exclude` only applies to messages
+    that are no longer available remotely.
+
+    Top-level messages are yielded as soon as they are fetched.
+    When a child arrives after its parent, it is attached to the parent,
+    which is then yielded again.
+    Children whose parent is never fetched are yielded on their own at the end.
+    """
+    parents = dict[str, IncomingMessage]()
+    orphans = defaultdict[str, list[IncomingMessage]](list)
+
     local, remote = await _fetch_ids(author, broadcasts=broadcasts)
-    for ident in remote if remote_only else local | remote:
+    for ident in local | remote:
         for agent in await client.get_agents(client.user.address):
             if msg := await _fetch_from_agent(
                 (
@@ -503,20 +722,33 @@ async def _fetch(
                 author,
                 ident,
                 broadcast=broadcasts,
-                exclude=exclude,
+                exclude=exclude if exclude_remote or (ident not in remote) else (),
+                bodies=bodies,
             ):
-                messages[msg.ident] = msg
                 break
+        else:
+            continue
+
+        if msg.parent_id:
+            if not (parent := parents.get(msg.parent_id)):
+                orphans[msg.parent_id].append(msg)
+                continue
+
+            parent.add_child(msg)
+
+        else:
+            parent = parents[msg.ident] = msg
+            for child in orphans.pop(msg.ident, ()):
+                parent.add_child(child)
 
-    for ident, msg in messages.copy().items():
-        if msg.parent_id and (parent := messages.get(msg.parent_id)):
-            parent.add_child(messages.pop(ident))
+        parent.reconstruct_from_children()
+        yield parent, parent.ident in remote
 
-    for msg in messages.values():
-        msg.reconstruct_from_children()
+    for children in orphans.values():
+        for child in children:
+            yield child, child.ident in remote
 
     logger.debug("Fetched messages from %s", author)
-    return tuple(messages.values())
 
 
 async def _build(msg: OutgoingMessage, /):
@@ -612,12 +844,12 @@ async def _build_access(
     readers: Iterable[Address],
     access_key: bytes,
 ) -> tuple[str, ...]:
-    from .profile import fetch
+    from .profile import MAX_AGE, fetch
 
     access = list[str]()
     for reader in *readers, client.user.address:
         if not (
-            (profile := await fetch(reader))
+            (profile := await fetch(reader, max_age=MAX_AGE))
             and (key := profile.encryption_key)
             and (key_id := key.key_id)
         ):
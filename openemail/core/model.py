@@ -5,13 +5,14 @@
 
 import re
 from base64 import b64decode
+from collections.abc import Callable, Mapping, Sequence
 from contextlib import suppress
-from dataclasses import dataclass, fields
+from dataclasses import MISSING, dataclass, fields
 from datetime import UTC, date, datetime
 from hashlib import sha256
 from itertools import chain
 from logging import getLogger
-from types import NoneType, UnionType
+from types import MappingProxyType, NoneType, UnionType
 from typing import Any, NamedTuple, Protocol, Self, get_args, get_origin
 
 from . import crypto
@@ -23,6 +24,10 @@ MESSAGE_LIFETIME = 7
 
 logger = getLogger(__name__)
 
+# Shared by all messages without readers, files or children
+_NO_ITEMS: Sequence[Any] = ()
+_NO_ENTRIES: Mapping[Any, Any] = MappingProxyType({})
+
 
 class WriteError(Exception):
     """Raised if writing to the server fails."""
@@ -108,11 +113,11 @@ class Message(Protocol):
     date: datetime
     subject: str
 
-    readers: list[Address]
+    readers: Sequence[Address]
     access_key: bytes | None
 
-    attachments: dict[str, list[Self]]
-    children: list[Self]
+    attachments: Mapping[str, list[Self]]
+    children: Sequence[Self]
     file: AttachmentProperties | None
     attachment_url: str | None
 
@@ -128,6 +133,24 @@ class Message(Protocol):
 class DraftMessage:
     """A local message, saved as a draft."""
 
+    __slots__ = (
+        "_broadcast",
+        "access_key",
+        "attachment_url",
+        "attachments",
+        "author",
+        "body",
+        "children",
+        "date",
+        "file",
+        "ident",
+        "new",
+        "original_author",
+        "readers",
+        "subject",
+        "subject_id",
+    )
+
     @property
     def is_broadcast(self) -> bool:
         """Whether `self` is a broadcast."""
@@ -168,6 +191,28 @@ class DraftMessage:
 class OutgoingMessage:
     """A local message, to be sent."""
 
+    __slots__ = (
+        "access_key",
+        "attachment_url",
+        "attachments",
+        "author",
+        "body",
+        "children",
+        "content",
+        "date",
+        "file",
+        "files",
+        "headers",
+        "ident",
+        "new",
+        "original_author",
+        "parent_id",
+        "readers",
+        "sending",
+        "subject",
+        "subject_id",
+    )
+
     @property
     def is_broadcast(self) -> bool:
         """Whether `self` is a broadcast."""
@@ -240,12 +285,40 @@ class OutgoingMessage:
 
 
 class IncomingMessage:
-    """A remote message."""
+    """A remote message.
+
+    Only the fields used after construction are kept,
+    the raw envelope headers are dropped once they are verified.
+    """
+
+    __slots__ = (
+        "_broadcast",
+        "_merged",
+        "access_key",
+        "attachment_url",
+        "attachments",
+        "author",
+        "body",
+        "children",
+        "date",
+        "file",
+        "files",
+        "ident",
+        "new",
+        "original_author",
+        "parent_id",
+        "readers",
+        "size",
+        "stored",
+        "subject",
+        "subject_id",
+        "url",
+    )
 
     @property
     def is_broadcast(self) -> bool:
         """Whether `self` is a broadcast."""
-        return not self.access_links
+        return self._broadcast
 
     @property
     def is_child(self) -> bool:
@@ -264,40 +337,38 @@ class IncomingMessage:
         self.author = author
         self.original_author: Address
         self.date: datetime
-        self.checksum: str | None = None
         self.subject: str
         self.subject_id: str | None = None
-        self.headers = {k.lower(): v.strip() for k, v in headers.items()}
+        self.size = 0
 
-        self.readers = list[Address]()
-        self.access_links: str | None = None
+        self.readers: Sequence[Address] = _NO_ITEMS
         self.access_key: bytes | None = None
-        self.private_key = private_key
+        self._broadcast = True
 
-        self.files = dict[str, AttachmentProperties]()
-        self.attachments = dict[str, list[IncomingMessage]]()
-        self.children = list[IncomingMessage]()
+        self.files: Mapping[str, AttachmentProperties] = _NO_ENTRIES
+        self.attachments: Mapping[str, list[IncomingMessage]] = _NO_ENTRIES
+        self.children: Sequence[IncomingMessage] = _NO_ITEMS
+        self._merged: frozenset[str] = frozenset()
         self.file: AttachmentProperties | None = None
         self.attachment_url: str | None = None
         self.parent_id: str | None = None
+        self.url: str | None = None
 
         self.body: str | None = None
+        self.stored = False
         self.new = new
 
-        message_headers: str | None = None
-        for key, value in self.headers.items():
+        envelope = {k.lower(): v.strip() for k, v in headers.items()}
+        message_headers = checksum_header = None
+        for key, value in envelope.items():
             match key:
-                case "message-access":
-                    self.access_links = value
-                    reader_links = (
-                        link.strip() for link in self.access_links.split(",")
-                    )
-
-                    for link in reader_links:
+                case "message-access" if value:
+                    self._broadcast = False
+                    for link in (link.strip() for link in value.split(",")):
                         try:
                             reader = parse_headers(link)
                             self.access_key = crypto.decrypt_anonymous(
-                                reader["value"], self.private_key
+                                reader["value"], private_key
                             )
                             break
 
@@ -308,17 +379,20 @@ class IncomingMessage:
                     message_headers = value
 
                 case "message-checksum":
-                    self.checksum = value
+                    checksum_header = value
+
+                case "content-length" if value.isdigit():
+                    self.size = int(value)
 
         if not message_headers:
             e = "Empty message headers"
             raise ValueError(e)
 
-        if not self.checksum:
+        if not checksum_header:
             e = "Missing checksum"
             raise ValueError(e)
 
-        checksum = parse_headers(self.checksum)
+        checksum = parse_headers(checksum_header)
 
         try:
             if checksum["algorithm"] != crypto.CHECKSUM_ALGORITHM:
@@ -331,7 +405,7 @@ class IncomingMessage:
                     (
                         "".join(
                             (
-                                self.headers.get(field.lower(), "")
+                                envelope.get(field.lower(), "")
                                 for field in (
                                     header.strip()
                                     for header in checksum["order"].split(":")
@@ -389,10 +463,11 @@ class IncomingMessage:
             return int(string) if string and string.isdigit() else 0
 
         if files := headers.get("files"):
+            self.files = attachment_files = dict[str, AttachmentProperties]()
             for file in files.split(","):
                 file_headers = parse_headers(file.strip())
                 try:
-                    self.files[file_headers["id"]] = AttachmentProperties(
+                    attachment_files[file_headers["id"]] = AttachmentProperties(
                         file_headers["name"],
                         file_headers["id"],
                         file_headers.get("type") or "application/octet-stream",
@@ -412,7 +487,7 @@ class IncomingMessage:
                     self.ident,
                     file_headers.get("type") or "application/octet-stream",
                     str_to_int(file_headers.get("size"))
-                    or str_to_int(self.headers.get("size")),
+                    or str_to_int(envelope.get("size")),
                     AttachmentProperties.parse_part(part)
                     if (part := file_headers.get("part"))
                     else (0, 0),
@@ -420,15 +495,16 @@ class IncomingMessage:
                 )
 
         if readers := headers.get("readers"):
+            self.readers = reader_addresses = list[Address]()
             for reader in readers.split(","):
                 try:
-                    self.readers.append(Address(reader.strip()))
+                    reader_addresses.append(Address(reader.strip()))
                 except ValueError:  # noqa: PERF203
                     continue
 
     def add_child(self, child: Self):
         """Add `child` to `self.children`, updating its properties accordingly."""
-        self.children.append(child)
+        self.children = [*self.children, child]
 
         if not (
             self.files
@@ -442,9 +518,10 @@ class IncomingMessage:
     def reconstruct_from_children(self):
         """Reconstruct the entire contents of this message from all of its children.
 
-        Should only be called after all children have been fetched and added.
+        Can be called again as more children are added.
         """
         parts = list[IncomingMessage]()
+        attachments = dict[str, list[IncomingMessage]]()
 
         for child in self.children:
             if not (child.parent_id and (child.parent_id == self.ident)):
@@ -456,15 +533,21 @@ class IncomingMessage:
             if not child.file:
                 continue
 
-            if not (attachment := self.attachments.get(child.file.name)):
-                attachment = self.attachments[child.file.name] = []
+            if not (attachment := attachments.get(child.file.name)):
+                attachment = attachments[child.file.name] = []
 
             attachment.append(child)
 
-        for part in chain((parts,), self.attachments.values()):
+        for part in chain((parts,), attachments.values()):
             part.sort(key=lambda p: p.file.part[0] if p.file else 0)
 
+        self.attachments = attachments or _NO_ENTRIES
+
         for part in parts:
+            if part.ident in self._merged:
+                continue
+
+            self._merged |= {part.ident}
             self.body = (self.body or "") + (part.body or "")
 
 
@@ -527,68 +610,98 @@ class Profile:
     public_access: bool = True
 
     def __init__(self, address: Address, data: str):
-        parsed_fields = {
-            (split := field.split(":", 1))[0].strip().lower(): split[1].strip()
-            for field in (line.strip() for line in data.split("\n") if ":" in line)
-            if not field.startswith("#")
-        }
+        self.address = address
+        parsed = set[str]()
 
-        for f in fields(Profile):
-            if f.name == "address":
+        for line in data.split("\n"):
+            if (":" not in line) or (line := line.strip()).startswith("#"):
                 continue
 
-            value = parsed_fields.get(f.name.replace("_", "-"))
-            required = get_origin(t := f.type) is not UnionType
+            key, value = line.split(":", 1)
+            if not (field := _PROFILE_FIELDS.get(key.strip().lower())):
+                continue
 
-            if value is None:
-                if isinstance(t, type) and isinstance(f.default, t):
-                    setattr(self, f.name, f.default)
-                    continue
+            value = field.parse(value) if field.parse else value.strip()
+            if field.required and (value is None):
+                e = f'Required field "{field.name}" contains invalid data'
+                raise ValueError(e)
 
-                if required:
-                    e = f'Required field "{f.name}" does not exist'
-                    raise ValueError(e)
+            setattr(self, field.name, value)
+            parsed.add(field.name)
 
-                setattr(self, f.name, None)
+        for name, default in _PROFILE_DEFAULTS.items():
+            if name in parsed:
                 continue
 
-            if not required:
-                t = next(iter(set(get_args(f.type)) - {NoneType}))
+            if default is MISSING:
+                e = f'Required field "{name}" does not exist'
+                raise ValueError(e)
 
-            if t is bool:
-                value = value == "Yes"
+            setattr(self, name, default)
 
-            elif t is date:
-                try:
-                    value = date.fromisoformat(value)
-                except ValueError:
-                    value = None
 
-            elif t is datetime:
-                try:
-                    value = datetime.fromisoformat(value)
-                except ValueError:
-                    value = None
+class _ProfileField(NamedTuple):
+    name: str
+    parse: Callable[[str], Any] | None
+    required: bool
 
-            elif t is Key:
-                attrs = parse_headers(value)
 
-                try:
-                    value = Key(
-                        b64decode(attrs["value"]),
-                        attrs["algorithm"],
-                        attrs.get("id"),
-                    )
-                except (KeyError, ValueError):
-                    value = None
+def _parse_bool(value: str) -> bool:
+    return value.strip() == "Yes"
 
-            if required and (value is None):
-                e = f'Required field "{f.name}" contains invalid data'
-                raise ValueError(e)
 
-            setattr(self, f.name, value)
+def _parse_date(value: str) -> date | None:
+    try:
+        return date.fromisoformat(value.strip())
+    except ValueError:
+        return None
 
-        self.address = address
+
+def _parse_datetime(value: str) -> datetime | None:
+    try:
+        return datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+
+
+def _parse_key(value: str) -> Key | None:
+    attrs = parse_headers(value.strip())
+
+    try:
+        return Key(b64decode(attrs["value"]), attrs["algorithm"], attrs.get("id"))
+    except (KeyError, ValueError):
+        return None
+
+
+def _compile_profile_fields() -> tuple[dict[str, _ProfileField], dict[str, Any]]:
+    parsers: dict[Any, Callable[[str], Any]] = {
+        bool: _parse_bool,
+        date: _parse_date,
+        datetime: _parse_datetime,
+        Key: _parse_key,
+    }
+
+    table, defaults = {}, {}
+    for f in fields(Profile):
+        if f.name == "address":
+            continue
+
+        t, required = f.type, get_origin(f.type) is not UnionType
+        if not required:
+            t = next(iter(set(get_args(f.type)) - {NoneType}))
+
+        table[f.name.replace("_", "-")] = _ProfileField(
+            f.name, parsers.get(t), required
+        )
+        defaults[f.name] = (
+            f.default if f.default is not MISSING else (MISSING if required else None)
+        )
+
+    return table, defaults
+
+
+# Resolve field types once instead of on every parse
+_PROFILE_FIELDS, _PROFILE_DEFAULTS = _compile_profile_fields()
 
 
 def parse_headers(data: str) -> dict[str, str]:
@@ -3,21 +3,91 @@
 # SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
 # SPDX-FileContributor: kramo
 
+import asyncio
 from contextlib import suppress
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from logging import getLogger
+from time import monotonic
 
-from . import cache_dir, client, model, urls
+from . import cache_dir, client, create_task, model, urls
+from .cache import DiskCache, Stats
+from .lru import LRU
 from .model import Address, Profile, WriteError
 
 MAX_PROFILE_SIZE = 64_000
 MAX_PROFILE_IMAGE_SIZE = 640_000
+MAX_AGE = 300
+NEGATIVE_MAX_AGE = 60
+MAX_CACHED_PROFILES = 1_000
 
 logger = getLogger(__name__)
 
 
-async def fetch(address: Address) -> Profile | None:
-    """Fetch the remote profile associated with a given `address`."""
+@dataclass(slots=True)
+class _Entry:
+    profile: Profile | None
+    fetched: float | None = None
+    missing: bool = False
+
+
+_profiles = LRU[Address, _Entry](MAX_CACHED_PROFILES)
+_profile_cache = DiskCache(
+    cache_dir / "profiles", max_size=16_000_000, max_entries=5_000
+)
+_image_cache = DiskCache(cache_dir / "images", max_size=128_000_000, max_entries=5_000)
+_fetching = dict[Address, asyncio.Task[Profile | None]]()
+
+
+async def fetch(address: Address, *, max_age: float | None = None) -> Profile | None:
+    """Fetch the remote profile associated with a given `address`.
+
+    If `max_age` is set, a profile fetched less than `max_age` seconds ago
+    is returned from memory instead, for example `MAX_AGE`.
+    Profiles that could not be fetched are remembered as missing
+    for at most `NEGATIVE_MAX_AGE` seconds.
+
+    Concurrent fetches for the same `address` share a single request.
+    """
+    if (
+        (max_age is not None)
+        and (entry := _profiles.get(address))
+        and (entry.fetched is not None)
+        and (
+            monotonic() - entry.fetched
+            < (min(max_age, NEGATIVE_MAX_AGE) if entry.missing else max_age)
+        )
+    ):
+        return None if entry.missing else entry.profile
+
+    if not (task := _fetching.get(address)):
+        task = _fetching[address] = create_task(_fetch(address))
+        task.add_done_callback(lambda _: _fetching.pop(address, None))
+
+    return await asyncio.shield(task)
+
+
+def invalidate(*addresses: Address):
+    """Forget the profiles of `addresses` held in memory, or all if none are given.
+
+    Should be called when the keys of a profile are known to have changed.
+    """
+    if not addresses:
+        _profiles.clear()
+        return
+
+    for address in addresses:
+        _profiles.pop(address)
+
+
+def _entry(address: Address) -> _Entry:
+    if not (entry := _profiles.get(address)):
+        entry = _profiles[address] = _Entry(None)
+
+    return entry
+
+
+async def _fetch(address: Address) -> Profile | None:
     logger.debug("Fetching profile for %s…", address)
     for agent in await client.get_agents(address):
         if not (response := await client.request(urls.Mail(agent, address).profile)):
@@ -32,25 +102,50 @@ async def fetch(address: Address) -> Profile | None:
         except (UnicodeError, ValueError):
             continue
 
-        # TODO: Clear cache
-        (caches_dir := cache_dir / "profiles").mkdir(parents=True, exist_ok=True)
-        (caches_dir / address).write_text(contents)
+        _profile_cache.write(address, contents.encode("utf-8"))
+
+        _profiles[address] = _Entry(profile, monotonic())
 
         logger.debug("Profile fetched for %s", address)
         return profile
 
+    entry = _entry(address)
+    entry.fetched, entry.missing = monotonic(), True
+
     logger.error("Could not fetch profile for %s", address)
     return None
 
 
 def cached(address: Address) -> Profile | None:
-    """Load the locally cached profile of a given `address`, if one exists."""
-    with suppress(FileNotFoundError, ValueError):
-        return Profile(address, (cache_dir / "profiles" / address).read_text())
+    """Load the locally cached profile of a given `address`, if one exists.
+
+    The profile is only read from disk and parsed if it is not in memory yet.
+    """
+    if (entry := _profiles.get(address)) and entry.profile:
+        return entry.profile
+
+    if (contents := _profile_cache.read(address)) is None:
+        return None
+
+    with suppress(UnicodeError, ValueError):
+        profile = Profile(address, contents.decode("utf-8"))
+        _entry(address).profile = profile
+        return profile
 
     return None
 
 
+def prune_caches():
+    """Delete cached profiles and images that were not used in a long time."""
+    _profile_cache.prune()
+    _image_cache.prune()
+
+
+def cache_stats() -> dict[str, Stats]:
+    """Get metrics of the profile and profile image caches on disk."""
+    return {"profiles": _profile_cache.stats(), "images": _image_cache.stats()}
+
+
 async def update(values: dict[str, str]):
     """Update `core.user`'s public profile with `values`."""
     logger.debug("Updating user profile…")
@@ -81,6 +176,7 @@ async def update(values: dict[str, str]):
             method="PUT",
             data=data,
         ):
+            invalidate(client.user.address)
             logger.info("Profile updated")
             return
 
@@ -103,9 +199,7 @@ async def fetch_image(address: Address) -> bytes | None:
         with response:
             contents = response.read()
 
-        # TODO: Clear cache
-        (caches_dir := cache_dir / "images").mkdir(parents=True, exist_ok=True)
-        (caches_dir / address).write_bytes(contents)
+        _image_cache.write(address, contents)
 
         logger.debug("Profile image fetched for %s", address)
         return contents
@@ -116,10 +210,7 @@ async def fetch_image(address: Address) -> bytes | None:
 
 def cached_image(address: Address) -> bytes | None:
     """Load the locally cached profile image of a given `address`, if one exists."""
-    with suppress(FileNotFoundError, ValueError):
-        return (cache_dir / "images" / address).read_bytes()
-
-    return None
+    return _image_cache.read(address)
 
 
 async def update_image(image: bytes):
@@ -41,8 +41,8 @@ class Application(Adw.Application):
 
         if interval := store.settings.get_uint("empty-trash-interval"):
             expired = tuple(self._get_expired_trash_items(interval))
-            store.settings_discard("trashed-messages", *expired)
-            store.settings_add("deleted-messages", *expired)
+            store.trashed.discard(*expired)
+            store.deleted.add(*expired)
 
         if (
             (address := store.settings.get_string("address"))
@@ -93,8 +93,7 @@ class Application(Adw.Application):
     @staticmethod
     def _get_expired_trash_items(interval: int) -> Generator[str]:
         today = datetime.now(UTC).date()
-        for msg in store.settings.get_strv("trashed-messages"):
-            ident, timestamp = msg.rsplit(maxsplit=1)
+        for ident, timestamp in store.trashed.items():
             with suppress(ValueError):
-                if (today - date.fromisoformat(timestamp)).days >= interval:
+                if (today - date.fromisoformat(timestamp or "")).days >= interval:
                     yield ident
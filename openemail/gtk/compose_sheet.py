@@ -173,7 +173,8 @@ class ComposeSheet(Adw.BreakpointBin):
                     for a in self.attachments.model
                     if isinstance(a, OutgoingAttachment)
                 ),
-            )
+            ),
+            group=tasks.SEND,
         )
 
         self._close()
@@ -271,11 +272,8 @@ class ComposeSheet(Adw.BreakpointBin):
             self.open_draft(draft)
 
     def _reply(self, _name, param: GLib.Variant, *_args):
-        ident = param.get_string()
-        for msgs in store.inbox, store.outbox, store.sent, store.broadcasts:
-            if msg := msgs.get(ident):
-                self.reply(msg)
-                return
+        if msg := store.messages.get(param.get_string()):
+            self.reply(msg)
 
     def _close(self):
         self.bottom_sheet.props.reveal_bottom_bar = False
@@ -41,6 +41,7 @@ class ContactRow(Gtk.Box):
         super().__init__(**kwargs)
 
         self.insert_action_group("row", group := Gio.SimpleActionGroup())
+        store.visible.track(self, "profile", lambda profile: (profile.address,))
         group.add_action_entries((
             (
                 "remove",
@@ -108,7 +108,7 @@ class LoginView(Adw.Bin):
             }),
         )
 
-        tasks.create(store.sync())
+        tasks.create(store.sync(), group=tasks.SYNC)
 
         def _reset():
             self.email_form.reset()
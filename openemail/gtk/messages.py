@@ -3,18 +3,21 @@
 # SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
 # SPDX-FileContributor: kramo
 
+import asyncio
 from collections.abc import Awaitable, Callable
 from typing import Any, cast, override
 
 from gi.repository import Adw, Gdk, Gio, GLib, GObject, Gtk
 
 from openemail import PREFIX, Property, store, tasks
-from openemail.message import Message
+from openemail.message import Message, search_bodies
 from openemail.store import DictStore
 
 from .page import Page
 from .thread_view import ThreadView
 
+SEARCH_DELAY = 0.3
+
 for t in Page, ThreadView:
     GObject.type_ensure(t)
 
@@ -35,6 +38,8 @@ class MessageRow(Gtk.Box):
         self._action_group = Gio.SimpleActionGroup()
         self.insert_action_group("row", self._action_group)
 
+        store.visible.track(self, "message", lambda msg: (msg.unique_id, msg.author))
+
         template = Gtk.ConstantExpression.new_for_value(self)
         message = Gtk.PropertyExpression.new(MessageRow, template, "message")
 
@@ -74,7 +79,7 @@ class MessageRow(Gtk.Box):
         )
         self._add_action(
             "discard",
-            lambda: tasks.create(self._discard()),
+            lambda: tasks.create(self._discard(), group=tasks.SEND),
             Gtk.PropertyExpression.new(Message, message, "can-discard"),
         )
 
@@ -110,6 +115,7 @@ class _Messages(Adw.NavigationPage):
     counter = Property(int)
 
     _count_unread = False
+    _search: asyncio.Task[Any] | None = None
 
     def __init__(
         self,
@@ -125,9 +131,9 @@ class _Messages(Adw.NavigationPage):
         self.builder = Gtk.Builder.new_from_resource(f"{PREFIX}/messages.ui")
 
         self.trashed: Gtk.BoolFilter = self._get_object("trashed")
-        store.settings.connect("changed::trashed-messages", self._on_trash_changed)
+        store.trashed.connect("changed", self._on_trash_changed)
 
-        self._get_object("sort_model").props.model = model
+        self._get_object("sort_model").props.model = self._model = model
         self.thread_view: ThreadView = self._get_object("thread_view")
 
         self.page: Page = self._get_object("page")
@@ -135,6 +141,15 @@ class _Messages(Adw.NavigationPage):
         self.page.subtitle = subtitle
         self.page.model.connect("notify::selected", self._on_selected)
 
+        # Bodies are mostly not in memory, so they are searched on disk instead
+        self._body_matches = set[str]()
+        self.body_filter: Gtk.CustomFilter = self._get_object("body_filter")
+        self.body_filter.set_filter_func(
+            lambda msg: msg.unique_id in self._body_matches
+        )
+        self.page.connect("notify::search-text", self._on_search_changed)
+        model.connect("items-changed", self._on_search_changed)
+
         self.props.child = self.page
 
         if not self._count_unread:
@@ -146,14 +161,31 @@ class _Messages(Adw.NavigationPage):
         )
 
         unread_filter = self._get_object("unread_filter")
-        store.settings.connect(
-            "changed::unread-messages",
-            lambda *_: unread_filter.changed(Gtk.FilterChange.DIFFERENT),
+        store.unread.connect(
+            "changed", lambda *_: unread_filter.changed(Gtk.FilterChange.DIFFERENT)
         )
 
     def _get_object(self, name: str) -> Any:  # noqa: ANN401
         return self.builder.get_object(name)
 
+    def _on_search_changed(self, *_args):
+        if self._search:
+            self._search.cancel()
+
+        if text := self.page.search_text:
+            self._search = tasks.create(self._search_bodies(text))
+        else:
+            self._set_body_matches(set())
+
+    async def _search_bodies(self, text: str):
+        await asyncio.sleep(SEARCH_DELAY)
+        self._set_body_matches(await search_bodies(self._model, text))
+
+    def _set_body_matches(self, matches: set[str]):
+        if matches != self._body_matches:
+            self._body_matches = matches
+            self.body_filter.changed(Gtk.FilterChange.DIFFERENT)
+
     def _on_trash_changed(self, *_args):
         props.autoselect = (props := self.page.model.props).selected != GLib.MAXUINT
         self.trashed.changed(Gtk.FilterChange.DIFFERENT)
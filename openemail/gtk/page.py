@@ -53,7 +53,7 @@ class Page(Adw.BreakpointBin):
 
     @Gtk.Template.Callback()
     def _sync(self, *_args):
-        tasks.create(store.sync())
+        tasks.create(store.sync(), group=tasks.SYNC)
 
     @Gtk.Template.Callback()
     def _get_sidebar_child_name(
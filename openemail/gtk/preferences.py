@@ -26,6 +26,7 @@ class Preferences(Adw.PreferencesDialog):
     confirm_remove_dialog: Adw.AlertDialog = child
     confirm_delete_dialog: Adw.AlertDialog = child
     sync_interval_combo_row: Adw.ComboRow = child
+    sync_bodies_row: Adw.SwitchRow = child
     empty_trash_combo_row: Adw.ComboRow = child
 
     domains: Adw.PreferencesGroup = child
@@ -49,6 +50,10 @@ class Preferences(Adw.PreferencesDialog):
         store.settings.connect("changed::trusted-domains", self._build_domains)
         self._build_domains()
 
+        Property.bind_setting(
+            store.settings, "sync-bodies", self.sync_bodies_row, "active"
+        )
+
         self.private_signing_key = str(client.user.signing_keys)
         self.private_encryption_key = str(client.user.encryption_keys.private)
         self.public_signing_key = str(client.user.signing_keys.public)
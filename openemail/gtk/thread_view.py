@@ -5,10 +5,10 @@
 
 from typing import TYPE_CHECKING, Any, cast
 
-from gi.repository import Adw, Gio, GLib, GObject, Gtk
+from gi.repository import Adw, GLib, GObject, Gtk
 
 from openemail import APP_ID, PREFIX, Property, store, tasks
-from openemail.message import Message
+from openemail.message import Conversation, Message
 
 from .attachments import Attachments
 from .body import Body
@@ -34,6 +34,11 @@ class MessageView(Gtk.Box):
     profile_dialog: Adw.Dialog = child
     profile_view: ProfileView = child
 
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+
+        store.visible.track(self, "message", lambda msg: (msg.unique_id, msg.author))
+
     @Gtk.Template.Callback()
     def _can_mark_unread(self, _obj, can_mark_unread: bool, new: bool) -> bool:
         return can_mark_unread and (not new)
@@ -83,20 +88,10 @@ class ThreadView(Adw.Bin):
 
     box: Gtk.ListBox = child
     viewport: Gtk.Viewport = child
-    sort_model: Gtk.SortListModel = child
 
     app_icon_name = Property(str, default=f"{APP_ID}-symbolic")
     message = Property[Message | None](Message)
-    subject_id = Property(str)
-    model = Property(
-        Gio.ListModel,
-        default=store.flatten(
-            store.inbox,
-            store.outbox,
-            store.broadcasts,
-            Gtk.FilterListModel.new(store.sent, store.outbox.filter),
-        ),
-    )
+    conversation = Property[Conversation | None](Conversation)
 
     def __init__(self, **kwargs: Any):
         super().__init__(**kwargs)
@@ -115,31 +110,32 @@ class ThreadView(Adw.Bin):
         )
 
         self._rows = dict[Message, Gtk.ListBoxRow]()
-        self.box.bind_model(self.sort_model, self._create_widget)
 
         self.connect("notify::message", self._on_message_changed)
         self.notify("message")
 
     def _on_message_changed(self, *_args):
-        if not self.message:
-            self._rows.clear()
-
-        self.subject_id = (
-            # "No ID" here is not proper, but I'm not sure what would be better.
-            # This needs to be done because the default behavior of StringFilter is to
-            # allow everything on ""/null instead of denying and you can't change this.
-            msg.subject_id if (msg := self.message) and msg.subject_id else "No ID"
+        conversation = (
+            store.messages.conversation(msg.subject_id)
+            if (msg := self.message) and msg.subject_id
+            else Conversation()
         )
 
+        if conversation is not self.conversation:
+            self._rows.clear()
+            self.conversation = conversation
+            self.box.bind_model(conversation, self._create_widget)
+
         (self.add_css_class if msg else self.remove_css_class)("view")
         (self.box.remove_css_class if msg else self.box.add_css_class)("background")
 
-        if self.message and (len(self.sort_model) > 1):
+        if msg and (len(conversation) > 1):
             GLib.timeout_add(100, self._scroll_to, self.message)
 
     def _create_widget(self, item: Message) -> Gtk.Widget:
         row = Gtk.ListBoxRow(activatable=False, child=MessageView(message=item))  # pyright: ignore[reportCallIssue]
         self._rows[item] = row
+        tasks.create(item.load_body(), group=tasks.UI)
         return row
 
     def _scroll_to(self, msg: Message, /):
@@ -87,7 +87,7 @@ class Window(Adw.ApplicationWindow):
         )
 
         app.notifier.connect("send", self._on_send_notification)
-        tasks.create(store.sync(periodic=True))
+        tasks.create(store.sync(periodic=True), group=tasks.SYNC)
 
         if client.user.logged_in:
             self.visible_child_name = "content"
@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+import asyncio
+from hashlib import sha256
+
+from gi.repository import Gdk, GdkPixbuf, Gio, GLib
+
+from .core.lru import LRU
+
+IMAGE_SIZE = 360
+MAX_CACHED_TEXTURES_SIZE = 64_000_000
+
+_textures = LRU[str, Gdk.Texture](
+    MAX_CACHED_TEXTURES_SIZE,
+    lambda texture: texture.props.width * texture.props.height * 4,
+)
+
+
+async def decode(data: bytes | None) -> Gdk.Texture | None:
+    """Decode `data` into a texture no larger than `IMAGE_SIZE` pixels.
+
+    Decoding and downscaling happen on a worker thread.
+    Textures are cached by the hash of `data`, so the same image is decoded once.
+
+    Returns `None` if `data` is empty or not a valid image.
+    """
+    if not data:
+        return None
+
+    key = sha256(data).hexdigest()
+    if texture := _textures.get(key):
+        return texture
+
+    try:
+        texture = await asyncio.to_thread(_decode, data)
+    except GLib.Error:
+        return None
+
+    _textures[key] = texture
+    return texture
+
+
+def _decode(data: bytes) -> Gdk.Texture:
+    pixbuf = GdkPixbuf.Pixbuf.new_from_stream(
+        Gio.MemoryInputStream.new_from_bytes(GLib.Bytes.new(data))
+    )
+
+    if (scale := IMAGE_SIZE / max(pixbuf.props.width, pixbuf.props.height)) < 1:
+        pixbuf = (
+            pixbuf.scale_simple(
+                dest_width=max(1, round(pixbuf.props.width * scale)),
+                dest_height=max(1, round(pixbuf.props.height * scale)),
+                interp_type=GdkPixbuf.InterpType.BILINEAR,
+            )
+            or pixbuf
+        )
+
+    return Gdk.MemoryTexture.new(
+        pixbuf.props.width,
+        pixbuf.props.height,
+        Gdk.MemoryFormat.R8G8B8A8
+        if pixbuf.props.has_alpha
+        else Gdk.MemoryFormat.R8G8B8,
+        pixbuf.read_pixel_bytes(),
+        pixbuf.props.rowstride,
+    )
@@ -3,12 +3,15 @@
 # SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
 # SPDX-FileContributor: kramo
 
+import asyncio
 from abc import abstractmethod
-from collections.abc import AsyncGenerator, Awaitable, Iterable
-from contextlib import suppress
+from bisect import bisect_right
+from collections import defaultdict
+from collections.abc import AsyncGenerator, Awaitable, Iterable, Iterator
 from datetime import UTC, datetime
 from gettext import ngettext
-from typing import Any, Self, cast, override
+from typing import Any, Protocol, Self, cast, override
+from weakref import WeakValueDictionary
 
 from gi.repository import Gdk, Gio, GLib, GObject, Gtk
 
@@ -16,9 +19,15 @@ import openemail as app
 
 from . import Property, tasks
 from .core import client, messages, model
+from .core.lru import LRU
 from .core.model import Address, WriteError
 from .profile import Profile
 
+MAX_CACHED_BODIES_SIZE = 4_000_000
+
+# Bodies of incoming messages, loaded from disk on demand
+_bodies = LRU[str, str](MAX_CACHED_BODIES_SIZE, len)
+
 
 def get_unique_id(msg: model.Message, /) -> str:
     """Get a globally unique identifier for `msg`."""
@@ -226,7 +235,6 @@ class Message(GObject.Object):
     subject_id = Property(str)
     readers = Property(str)
     attachments = Property(Gio.ListStore)
-    body = Property(str)
     is_broadcast = Property(bool)
 
     profile = Property(Profile)
@@ -256,7 +264,7 @@ class Message(GObject.Object):
         """Whether the message is unread."""
         from . import store
 
-        return self.unique_id in store.settings.get_strv("unread-messages")
+        return self.unique_id in store.unread
 
     @new.setter
     def new(self, new: bool):
@@ -268,9 +276,48 @@ class Message(GObject.Object):
         from . import store
 
         if new:
-            store.settings_add("unread-messages", self.unique_id)
+            store.unread.add(self.unique_id)
         else:
-            store.settings_discard("unread-messages", self.unique_id)
+            store.unread.discard(self.unique_id)
+
+    @Property(str)
+    def body(self) -> str:
+        """The contents of the message.
+
+        Bodies of incoming messages are only available once loaded by `load_body()`,
+        and are kept in a size-bounded cache shared by all messages.
+        """
+        if not (msg := self._msg):
+            return ""
+
+        if not isinstance(msg, model.IncomingMessage):
+            return msg.body or ""
+
+        return _bodies.get(self.unique_id) or ""
+
+    @property
+    def body_loaded(self) -> bool:
+        """Whether the body of `self` is available without calling `load_body()`."""
+        return (not isinstance(self._msg, model.IncomingMessage)) or (
+            self.unique_id in _bodies
+        )
+
+    @property
+    def pending_body_size(self) -> int | None:
+        """The size of the body of `self` if it still needs to be downloaded.
+
+        `None` if the body is already available or `self` is a part of another
+        message, which is never shown on its own.
+        `0` if the size is not known.
+        """
+        if (
+            isinstance(msg := self._msg, model.IncomingMessage)
+            and (not msg.stored)
+            and (not msg.is_child)
+        ):
+            return msg.size
+
+        return None
 
     @Property(bool)
     def trashed(self) -> bool:
@@ -280,10 +327,7 @@ class Message(GObject.Object):
 
         from . import store
 
-        return any(
-            msg.rsplit(maxsplit=1)[0] == self.unique_id
-            for msg in store.settings.get_strv("trashed-messages")
-        )
+        return self.unique_id in store.trashed
 
     def __init__(self, msg: model.Message | None = None, /, **kwargs: Any):
         super().__init__(**kwargs)
@@ -326,7 +370,7 @@ class Message(GObject.Object):
         )
 
         self.subject = msg.subject
-        self.body = msg.body or ""
+        self.notify("body")
         self.new = msg.new
         self.is_broadcast = msg.is_broadcast
 
@@ -398,6 +442,29 @@ class Message(GObject.Object):
             Property.bind(p, "image", self, "list-image"),
         )
 
+    def read_body(self) -> str:
+        """Read the body of `self` without keeping it in memory.
+
+        Bodies that are not loaded are read from disk, but never downloaded.
+        Blocks, so it should be called in a separate thread. See `search_bodies()`.
+        """
+        if not isinstance(msg := self._msg, model.IncomingMessage):
+            return (msg.body if msg else None) or ""
+
+        return messages.load_body(msg) or ""
+
+    async def load_body(self):
+        """Load the body of `self`, downloading it if it was synced without one."""
+        if not isinstance(msg := self._msg, model.IncomingMessage):
+            return
+
+        if self.body_loaded:
+            return
+
+        if (body := await messages.fetch_body(msg)) is not None:
+            _bodies[self.unique_id] = body
+            self.notify("body")
+
     def trash(self, *, notify: bool = False):
         """Move `self` to the trash.
 
@@ -408,10 +475,7 @@ class Message(GObject.Object):
 
         from . import store
 
-        store.settings_add(
-            "trashed-messages",
-            f"{self.unique_id} {datetime.now(UTC).date().isoformat()}",
-        )
+        store.trashed.add(self.unique_id, stamp=datetime.now(UTC).date().isoformat())
 
         self._update_trashed_state()
 
@@ -428,14 +492,7 @@ class Message(GObject.Object):
 
         from . import store
 
-        store.settings.set_strv(
-            "trashed-messages",
-            tuple(
-                msg
-                for msg in store.settings.get_strv("trashed-messages")
-                if msg.rsplit(maxsplit=1)[0] != self.unique_id
-            ),
-        )
+        store.trashed.discard(self.unique_id)
 
         self._update_trashed_state()
 
@@ -449,19 +506,14 @@ class Message(GObject.Object):
 
         from . import store
 
-        model = (
-            store.sent
-            if self._msg.author == client.user.address
-            else store.broadcasts
-            if self._msg.is_broadcast
-            else store.inbox
-        )
-
         for child in self._msg, *self._msg.children:
             messages.remove_from_disk(child)
 
-        store.settings_add("deleted-messages", self.unique_id)
-        model.remove(self.unique_id)
+        store.deleted.add(self.unique_id)
+        _bodies.pop(self.unique_id)
+        for owner in store.messages.owners(self.unique_id):
+            owner.remove(self.unique_id)
+
         self.restore()  # Since it is deleted, there is no reason to keep it in trash
         self.set_from_message(None)
 
@@ -477,9 +529,8 @@ class Message(GObject.Object):
 
         from . import store
 
-        store.outbox.remove(ident := self.unique_id)
-        with suppress(ValueError):
-            store.sent.remove(ident)
+        for owner in store.messages.owners(ident := self.unique_id):
+            owner.remove(ident)
 
         failed = False
         for msg in self._msg, *self._msg.children:
@@ -492,8 +543,8 @@ class Message(GObject.Object):
                 failed = True
                 continue
 
-        await store.outbox.update()
-        await store.sent.update()
+        # Updated together so that they share a single fetch
+        await asyncio.gather(store.outbox.update(), store.sent.update())
 
     def _update_trashed_state(self):
         self.can_trash = not (self.can_discard or self.trashed)
@@ -501,6 +552,201 @@ class Message(GObject.Object):
         self.notify("trashed")
 
 
+class Conversation(GObject.Object, Gio.ListModel):  # pyright: ignore[reportIncompatibleMethodOverride]
+    """The loaded messages in a thread, newest first.
+
+    Kept up to date by `MessageRegistry` as messages are loaded and removed.
+    """
+
+    __gtype_name__ = __qualname__
+
+    subject_id = Property(str)
+
+    def __init__(
+        self,
+        subject_id: str = "",
+        messages: Iterable[Message] = (),
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+
+        self.subject_id = subject_id
+        self._messages = sorted(messages, key=_newest_first)
+
+    def __iter__(self) -> Iterator[Message]:  # pyright: ignore[reportIncompatibleMethodOverride]
+        return super().__iter__()  # pyright: ignore[reportReturnType]
+
+    def do_get_item(self, position: int) -> Message | None:
+        """Get the item at `position`."""
+        try:
+            return self._messages[position]
+        except IndexError:
+            return None
+
+    def do_get_item_type(self) -> type[Message]:
+        """Get the type of the items in `self`."""
+        return Message
+
+    def do_get_n_items(self) -> int:
+        """Get the number of items in `self`."""
+        return len(self._messages)
+
+    def put(self, msg: Message):
+        """Insert `msg` into `self`, replacing a message with the same unique ID."""
+        for index, existing in enumerate(self._messages):
+            if existing.unique_id != msg.unique_id:
+                continue
+
+            if existing is not msg:
+                self._messages[index] = msg
+                self.items_changed(index, 1, 1)
+
+            return
+
+        index = bisect_right(self._messages, _newest_first(msg), key=_newest_first)
+        self._messages.insert(index, msg)
+        self.items_changed(index, 0, 1)
+
+    def discard(self, unique_id: str):
+        """Remove the message with `unique_id` from `self` if it is present."""
+        for index, msg in enumerate(self._messages):
+            if msg.unique_id == unique_id:
+                del self._messages[index]
+                self.items_changed(index, 1, 0)
+                return
+
+
+class MessageOwner(Protocol):
+    """A model that loads messages, such as `store.MessageStore`."""
+
+    def remove(self, item: str):
+        """Remove the message with the unique ID `item` from `self`."""
+        ...
+
+
+class MessageRegistry:
+    """Loaded messages of all stores except drafts, by unique ID, subject ID and author.
+
+    The same message can be loaded by multiple stores, such as the outbox and sent.
+    Lookups prefer the one that can be discarded.
+    """
+
+    def __init__(self):
+        self._messages = defaultdict[str, dict[MessageOwner, Message]](dict)
+        self._subjects = defaultdict[str, set[str]](set)
+        self._authors = defaultdict[str, set[str]](set)
+        self._conversations = WeakValueDictionary[str, Conversation]()
+
+    def __contains__(self, unique_id: object) -> bool:
+        return unique_id in self._messages
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def get(self, unique_id: str) -> Message | None:
+        """Get the message with `unique_id` or `None` if it is not loaded."""
+        if not (loaded := self._messages.get(unique_id)):
+            return None
+
+        return next(
+            (msg for msg in loaded.values() if msg.can_discard),
+            next(iter(loaded.values())),
+        )
+
+    def owners(self, unique_id: str) -> tuple[MessageOwner, ...]:
+        """Get the stores that loaded the message with `unique_id`."""
+        return tuple(self._messages.get(unique_id, ()))
+
+    def thread(self, subject_id: str) -> tuple[Message, ...]:
+        """Get the loaded messages in the thread `subject_id`."""
+        return self._resolve(self._subjects.get(subject_id, ()))
+
+    def conversation(self, subject_id: str) -> Conversation:
+        """Get a model of the thread `subject_id`, updated as messages are loaded.
+
+        Only conversations that are in use are kept up to date.
+        """
+        if (conversation := self._conversations.get(subject_id)) is None:
+            conversation = self._conversations[subject_id] = Conversation(
+                subject_id, self.thread(subject_id)
+            )
+
+        return conversation
+
+    def from_author(self, author: str) -> tuple[Message, ...]:
+        """Get the loaded messages written by `author`."""
+        return self._resolve(self._authors.get(author, ()))
+
+    def add(self, owner: MessageOwner, msg: Message):
+        """Register `msg` as loaded by `owner`."""
+        self._messages[msg.unique_id][owner] = msg
+        if msg.subject_id:
+            self._subjects[msg.subject_id].add(msg.unique_id)
+
+        self._authors[msg.author].add(msg.unique_id)
+
+        if (conversation := self._conversations.get(msg.subject_id)) is not None:
+            conversation.put(self.get(msg.unique_id) or msg)
+
+    def discard(self, owner: MessageOwner, unique_id: str):
+        """Unregister the message with `unique_id` loaded by `owner`."""
+        if not (loaded := self._messages.get(unique_id)):
+            return
+
+        if (msg := loaded.pop(owner, None)) is None:
+            return
+
+        conversation = self._conversations.get(msg.subject_id)
+        if loaded:
+            # Another store still has it, which may now be the preferred copy
+            if (conversation is not None) and (preferred := self.get(unique_id)):
+                conversation.put(preferred)
+
+            return
+
+        if conversation is not None:
+            conversation.discard(unique_id)
+
+        del self._messages[unique_id]
+        for index, key in (self._subjects, msg.subject_id), (self._authors, msg.author):
+            if (idents := index.get(key)) is None:
+                continue
+
+            idents.discard(unique_id)
+            if not idents:
+                del index[key]
+
+    def _resolve(self, unique_ids: Iterable[str]) -> tuple[Message, ...]:
+        return tuple(msg for ident in unique_ids if (msg := self.get(ident)))
+
+
+def _newest_first(msg: Message) -> int:
+    return -msg.date
+
+
+async def search_bodies(msgs: Iterable[Message], text: str) -> set[str]:
+    """Get the unique IDs of `msgs` with a body that contains `text`, ignoring case.
+
+    Bodies that are not loaded are read from disk in a separate thread,
+    without keeping them in memory.
+    """
+    text, found, unloaded = text.casefold(), set[str](), list[tuple[str, Message]]()
+    for msg in msgs:
+        if not msg.body_loaded:
+            unloaded.append((msg.unique_id, msg))
+        elif text in msg.body.casefold():
+            found.add(msg.unique_id)
+
+    def scan() -> set[str]:
+        return {
+            unique_id
+            for unique_id, msg in unloaded
+            if text in msg.read_body().casefold()
+        }
+
+    return found | await asyncio.to_thread(scan)
+
+
 async def send(
     readers: Iterable[Address],
     subject: str,
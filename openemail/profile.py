@@ -5,17 +5,20 @@
 
 from collections.abc import Iterator
 from typing import Any, Self
+from weakref import WeakValueDictionary
 
 from gi.repository import Gdk, GdkPixbuf, Gio, GLib, GObject
 
 import openemail as app
 
-from . import Property, tasks
+from . import Property, images, tasks
 from .core import client, contacts, model, profile
 from .core.crypto import KeyPair
+from .core.lru import LRU
 from .core.model import Address, User, WriteError
 
 MAX_IMAGE_DIMENSIONS = 800
+MAX_RECENT_PROFILES = 256
 
 
 class ProfileField(GObject.Object):
@@ -179,7 +182,7 @@ class Profile(GObject.Object):
 
         self._broadcasts = receive_broadcasts
 
-        tasks.create(store.broadcasts.update())
+        tasks.create(store.broadcasts.update(), group=tasks.SYNC)
         tasks.create(
             contacts.new(
                 self._profile.address,
@@ -257,6 +260,38 @@ class Profile(GObject.Object):
         self.notify("receive-broadcasts")
 
 
+class ProfileRegistry:
+    """Profiles by address, bounded in memory.
+
+    Profiles are only kept alive while they are in use,
+    for example by the address book or a message,
+    plus the `max_recent` most recently requested ones.
+    """
+
+    def __init__(self, max_recent: int = MAX_RECENT_PROFILES):
+        self._profiles = WeakValueDictionary[Address, Profile]()
+        self._recent = LRU[Address, Profile](max_recent)
+
+    def __getitem__(self, address: Address) -> Profile:
+        if (profile := self._profiles.get(address)) is None:
+            profile = self._profiles[address] = Profile()
+
+        self._recent[address] = profile
+        return profile
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def values(self) -> tuple[Profile, ...]:
+        """Get all profiles that are currently alive."""
+        return tuple(self._profiles.values())
+
+    def clear(self):
+        """Forget all profiles."""
+        self._profiles.clear()
+        self._recent.clear()
+
+
 # TODO: Maybe these could be methods of a subclass of Profile specific to the user
 async def refresh():
     """Update the profile of the user by fetching new data remotely."""
@@ -277,12 +312,9 @@ async def refresh():
                 prof.encryption_key,
             )
 
-    try:
-        Profile.of(client.user).image = Gdk.Texture.new_from_bytes(
-            GLib.Bytes.new(await profile.fetch_image(client.user.address))
-        )
-    except GLib.Error:
-        Profile.of(client.user).image = None
+    Profile.of(client.user).image = await images.decode(
+        await profile.fetch_image(client.user.address)
+    )
 
     Profile.of(client.user.address).image = Profile.of(client.user).image
     Profile.of(client.user.address).set_from_profile(prof)
@@ -0,0 +1,174 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+import asyncio
+import random
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from gi.repository import Gio, GLib, GObject
+
+from . import Property, tasks
+
+MAX_BACKOFF = 3600
+JITTER = 0.1
+
+
+class SingleFlight:
+    """Runs `func` at most once at a time.
+
+    Calls made while it is running wait for a single extra run once it finishes.
+    If `delay` is set, each run starts after `delay` seconds,
+    so that bursts of calls collapse into one.
+
+    `on_running` is called with `True` before the first run
+    and with `False` once no more runs are pending.
+    """
+
+    _again: bool = False
+    _done: asyncio.Future[None] | None = None
+
+    def __init__(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        *,
+        delay: float = 0,
+        on_running: Callable[[bool], Any] | None = None,
+    ):
+        self.func, self.delay, self.on_running = func, delay, on_running
+
+    async def run(self):
+        """Run `func`, or wait for the current run and the one after it.
+
+        Cancelling a waiting call does not cancel the run it is waiting for.
+        """
+        self._again = True
+        if self._done:
+            await asyncio.shield(self._done)
+            return
+
+        self._done = done = asyncio.get_running_loop().create_future()
+        if self.on_running:
+            self.on_running(True)
+
+        try:
+            while self._again:
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+
+                self._again = False
+                await self.func()
+
+        finally:
+            self._done = None
+            if not done.done():
+                done.set_result(None)
+
+            if self.on_running:
+                self.on_running(False)
+
+
+class Job(GObject.Object):
+    """A task that runs periodically, on its own cadence.
+
+    `func` runs the job and returns whether anything changed.
+
+    Runs are `interval()` seconds times `cadence` apart.
+    While nothing changes, the delay doubles up to `max_factor` times that,
+    and it is reset as soon as something changes.
+    After a failure or while offline, it doubles up to `MAX_BACKOFF` seconds instead.
+    All delays are randomized by up to `JITTER`.
+
+    If `interval()` returns 0, the job is only run manually using `run()`.
+    Call `schedule()` again once it changes.
+    """
+
+    __gtype_name__ = __qualname__
+
+    running = Property(bool)
+
+    _source: int = 0
+    _factor: float = 1
+    _failures: int = 0
+
+    def __init__(
+        self,
+        func: Callable[[], Awaitable[bool]],
+        interval: Callable[[], int],
+        cadence: float = 1,
+        *,
+        max_factor: float = 4,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+
+        self.func, self.interval = func, interval
+        self.cadence, self.max_factor = cadence, max_factor
+        self._flight = SingleFlight(self._run_once, on_running=self._on_running)
+
+        Gio.NetworkMonitor.get_default().connect(
+            "network-changed", self._on_network_changed
+        )
+
+    async def run(self):
+        """Run the job now, then schedule the next run.
+
+        If the job is already running, it is run again once it finishes
+        instead of running twice at the same time. See `SingleFlight`.
+        """
+        await self._flight.run()
+
+    def schedule(self):
+        """Schedule the next run, replacing the previously scheduled one."""
+        self.stop()
+
+        if not (interval := self.interval()):
+            return
+
+        delay = base = interval * self.cadence
+        if self._failures:
+            delay = max(base, min(base * 2 ** min(self._failures, 16), MAX_BACKOFF))
+        else:
+            delay *= self._factor
+
+        delay *= random.uniform(1 - JITTER, 1 + JITTER)  # noqa: S311
+        self._source = GLib.timeout_add_seconds(round(delay), self._on_timeout)
+
+    def stop(self):
+        """Cancel the next scheduled run."""
+        if self._source:
+            GLib.source_remove(self._source)
+            self._source = 0
+
+    async def _run_once(self):
+        if not Gio.NetworkMonitor.get_default().get_network_available():
+            self._failures += 1
+            return
+
+        try:
+            changed = await self.func()
+        except Exception:
+            self._failures += 1
+            raise
+
+        self._failures = 0
+        self._factor = 1 if changed else min(self._factor * 2, self.max_factor)
+
+    def _on_running(self, running: bool):
+        self.running = running
+        if not running:
+            self.schedule()
+
+    def _on_timeout(self) -> bool:
+        self._source = 0
+        tasks.create(self.run(), group=tasks.SYNC)
+        return GLib.SOURCE_REMOVE
+
+    def _on_network_changed(self, _monitor, available: bool):
+        # Catch up right away instead of waiting out the backoff
+        if available and self._failures and self._source:
+            self._failures = 0
+            self.stop()
+            tasks.create(self.run(), group=tasks.SYNC)
@@ -0,0 +1,246 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+from collections import defaultdict
+from collections.abc import ItemsView, Iterator
+from collections.abc import Set as AbstractSet
+from datetime import UTC, date, datetime
+from typing import Any, override
+
+from gi.repository import Gio, GLib, GObject
+
+from .core.model import MESSAGE_LIFETIME
+
+
+class MessageState(GObject.Object):
+    """A hashed index of message unique IDs, backed by a strv settings `key`.
+
+    Each ID can carry an optional `stamp`, stored after the ID, separated by a space.
+
+    Changes are written back to settings in a single batch once the main loop is idle,
+    after which `MessageState::changed` is emitted with the set of changed IDs.
+    """
+
+    __gtype_name__ = __qualname__
+
+    _changed = GObject.Signal("changed", arg_types=(object,))
+
+    _items: dict[str, str | None]
+    _pending: set[str]
+    _writing: bool = False
+    _flush_source: int = 0
+
+    def __init__(
+        self,
+        settings: Gio.Settings,
+        key: str,
+        /,
+        *,
+        stamped: bool = False,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+
+        self.settings, self.key, self.stamped = settings, key, stamped
+        self._items, self._pending = self._load(), set()
+
+        settings.connect(f"changed::{key}", self._on_settings_changed)
+
+    def __contains__(self, unique_id: object) -> bool:
+        return unique_id in self._items
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def items(self) -> ItemsView[str, str | None]:
+        """Get a view of unique IDs and their stamps."""
+        return self._items.items()
+
+    def get(self, unique_id: str) -> str | None:
+        """Get the stamp of `unique_id` or `None` if it is not in `self`."""
+        return self._items.get(unique_id)
+
+    def add(self, *unique_ids: str, stamp: str | None = None):
+        """Add `unique_ids` to `self`, with an optional `stamp`.
+
+        IDs that are already in `self` keep their original stamp.
+        """
+        for unique_id in unique_ids:
+            if unique_id in self._items:
+                continue
+
+            self._items[unique_id] = stamp
+            self._pending.add(unique_id)
+
+        self._schedule_flush()
+
+    def discard(self, *unique_ids: str):
+        """Discard `unique_ids` from `self`."""
+        for unique_id in unique_ids:
+            if unique_id in self._items:
+                del self._items[unique_id]
+                self._pending.add(unique_id)
+
+        self._schedule_flush()
+
+    def clear(self):
+        """Remove all IDs from `self`."""
+        self._pending.update(self._items)
+        self._items.clear()
+        self._schedule_flush()
+
+    def flush(self):
+        """Write pending changes to settings immediately."""
+        if self._flush_source:
+            GLib.source_remove(self._flush_source)
+
+        self._flush()
+
+    def _schedule_flush(self):
+        if self._pending and not self._flush_source:
+            self._flush_source = GLib.idle_add(self._flush)
+
+    def _flush(self) -> bool:
+        self._flush_source = 0
+        if not self._pending:
+            return GLib.SOURCE_REMOVE
+
+        self._writing = True
+        self.settings.set_strv(
+            self.key,
+            tuple(
+                f"{unique_id} {stamp}" if stamp else unique_id
+                for unique_id, stamp in self._items.items()
+            ),
+        )
+        self._writing = False
+
+        changed, self._pending = frozenset(self._pending), set()
+        self.emit("changed", changed)
+        return GLib.SOURCE_REMOVE
+
+    def _load(self) -> dict[str, str | None]:
+        if not self.stamped:
+            return dict.fromkeys(self.settings.get_strv(self.key))
+
+        items = dict[str, str | None]()
+        for entry in self.settings.get_strv(self.key):
+            unique_id, _sep, stamp = entry.rpartition(" ")
+            items[unique_id] = stamp
+
+        return items
+
+    def _on_settings_changed(self, *_args):
+        if self._writing:
+            return
+
+        old, self._items = self._items, self._load()
+        changed = frozenset(
+            unique_id
+            for unique_id in old.keys() | self._items.keys()
+            if old.get(unique_id, False) != self._items.get(unique_id, False)
+        )
+
+        if changed:
+            self.emit("changed", changed)
+
+
+class Tombstones(MessageState):
+    """An index of deleted message unique IDs, grouped by the host of their author.
+
+    Tombstones are stamped with the date of deletion and expire after
+    `MESSAGE_LIFETIME` days, at which point the server no longer has the message.
+    Call `compact()` to drop expired tombstones from settings.
+    """
+
+    __gtype_name__ = __qualname__
+
+    _hosts: defaultdict[str, set[str]]
+    _legacy: set[str]
+
+    def __init__(self, settings: Gio.Settings, key: str, /, **kwargs: Any):
+        super().__init__(settings, key, stamped=True, **kwargs)
+
+    def exclude(self, host: str) -> AbstractSet[str]:
+        """Get the IDs of messages deleted from authors on `host`.
+
+        The returned set is live and should not be modified.
+        """
+        return self._hosts[host]
+
+    @override
+    def add(self, *unique_ids: str, stamp: str | None = None):
+        """Add `unique_ids` to `self`, stamped with `stamp` or today's date."""
+        super().add(*unique_ids, stamp=stamp or datetime.now(UTC).date().isoformat())
+        for unique_id in unique_ids:
+            host, _sep, ident = unique_id.partition(" ")
+            self._hosts[host].add(ident)
+
+    @override
+    def discard(self, *unique_ids: str):
+        super().discard(*unique_ids)
+        for unique_id in unique_ids:
+            host, _sep, ident = unique_id.partition(" ")
+            if idents := self._hosts.get(host):
+                idents.discard(ident)
+
+    @override
+    def clear(self):
+        super().clear()
+        for idents in self._hosts.values():
+            idents.clear()
+
+    def compact(self):
+        """Drop expired tombstones and rewrite legacy entries with a stamp."""
+        today = datetime.now(UTC).date()
+        expired = set[str]()
+        for unique_id, stamp in self.items():
+            try:
+                deleted = date.fromisoformat(stamp or "")
+            except ValueError:
+                deleted = today
+
+            if (today - deleted).days >= MESSAGE_LIFETIME:
+                expired.add(unique_id)
+
+        self._pending.update(self._legacy)
+        self._legacy.clear()
+        self.discard(*expired)
+
+    @override
+    def _load(self) -> dict[str, str | None]:
+        today = datetime.now(UTC).date().isoformat()
+        items = dict[str, str | None]()
+        hosts = defaultdict[str, set[str]](set)
+        self._legacy = set()
+
+        for entry in self.settings.get_strv(self.key):
+            match entry.split(" "):
+                case [host, ident, stamp]:
+                    pass
+                case [host, ident]:
+                    # Deleted before tombstones were stamped
+                    stamp = today
+                    self._legacy.add(entry)
+                case _:
+                    continue
+
+            items[f"{host} {ident}"] = stamp
+            hosts[host].add(ident)
+
+        if (current := getattr(self, "_hosts", None)) is None:
+            self._hosts = hosts
+            return items
+
+        # Sets returned by `exclude()` are live, so update them in place
+        for host, idents in current.items():
+            idents.clear()
+            idents.update(hosts.pop(host, ()))
+
+        current.update(hosts)
+        return items
@@ -3,37 +3,53 @@
 # SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
 # SPDX-FileContributor: kramo
 
+import asyncio
 import re
 from abc import abstractmethod
-from collections import defaultdict
+from bisect import bisect_left, insort
 from collections.abc import (
     AsyncGenerator,
     AsyncIterable,
     Callable,
-    Coroutine,
     Iterable,
     Iterator,
+    KeysView,
 )
+from collections.abc import Set as AbstractSet
 from contextlib import suppress
 from functools import partial
-from itertools import chain
+from itertools import chain, count
 from pathlib import Path
+from time import monotonic
 from typing import Any
 
-from gi.repository import Gdk, Gio, GLib, GObject, Gtk
+from gi.repository import Gio, GLib, GObject, Gtk
 
 import openemail as app
 
-from . import APP_ID, Property, core, message, profile, tasks
+from . import APP_ID, Property, core, images, message, profile, tasks
 from .core import client, contacts, model
 from .core import drafts as core_drafts
 from .core import messages as core_messages
 from .core import profile as core_profile
 from .core.model import Address, WriteError
-from .message import Message
-from .profile import Profile
+from .message import Message, MessageRegistry
+from .profile import Profile, ProfileRegistry
+from .scheduler import Job, SingleFlight
+from .state import MessageState, Tombstones
+from .visibility import Visibility
 
 ADDRESS_SPLIT_PATTERN = ",|;| "
+PREFETCH_BUDGET = 2_000_000
+PREFETCH_UNKNOWN_SIZE = 256_000
+UPDATE_DEBOUNCE = 0.25
+RETAIN_MAX_RUNS = 64
+REINDEX_AFTER = 1_024
+VISIBLE_BODY_DELAY = 0.15
+PROFILE_WORKERS = 4
+MERGE_WORKERS = 6
+PROFILE_BATCH = 200
+PROFILE_MAX_AGE = 3600
 
 settings = Gio.Settings.new(APP_ID)
 state_settings = Gio.Settings.new(f"{APP_ID}.State")
@@ -42,8 +58,17 @@ secret_service = f"{APP_ID}.Keys"
 # TODO: This may not work?
 core.data_dir = Path(GLib.get_user_data_dir(), "openemail")
 core.cache_dir = Path(GLib.get_user_cache_dir(), "openemail")
+core.task_factory = tasks.create
 
-profiles = defaultdict[Address, Profile](Profile)
+profiles = ProfileRegistry()
+messages = MessageRegistry()
+
+unread = MessageState(settings, "unread-messages")
+trashed = MessageState(settings, "trashed-messages", stamped=True)
+deleted = Tombstones(settings, "deleted-messages")
+visible = Visibility()
+
+_refreshed = dict[tuple[Address, bool], float]()
 
 
 def flatten(*models: GObject.Object) -> Gtk.FlattenListModel:
@@ -56,7 +81,14 @@ def flatten(*models: GObject.Object) -> Gtk.FlattenListModel:
 
 
 class DictStore[K, V](GObject.Object, Gio.ListModel):  # pyright: ignore[reportIncompatibleMethodOverride]
-    """An implementation of `Gio.ListModel` for storing data in a Python dictionary."""
+    """An implementation of `Gio.ListModel` for storing data in a Python dictionary.
+
+    Items are also kept in a list in insertion order, for constant-time access
+    by position. The position of each key is indexed when it is added.
+    Positions of removed keys are kept in a sorted list, so that the current
+    position of a key is found by bisecting it. The index is rebuilt once
+    more than `REINDEX_AFTER` keys were removed.
+    """
 
     __gtype_name__ = __qualname__
 
@@ -67,6 +99,10 @@ class DictStore[K, V](GObject.Object, Gio.ListModel):  # pyright: ignore[reportI
 
     _item_type: type
     _items: dict[K, V]
+    _keys: list[K]
+    _values: list[V]
+    _positions: dict[K, int]  # Positions of keys when they were indexed
+    _removed: list[int]  # Indexed positions of keys removed since, sorted
 
     @Property(GObject.Object)
     def item_type(self) -> type:
@@ -84,19 +120,29 @@ class DictStore[K, V](GObject.Object, Gio.ListModel):  # pyright: ignore[reportI
     def __init__(self, **kwargs: Any):
         super().__init__(**kwargs)
 
-        self._items = {}
+        self._items, self._keys, self._values = {}, [], []
+        self._positions, self._removed = {}, []
+        self._flight = SingleFlight(
+            self._update,
+            delay=UPDATE_DEBOUNCE,
+            on_running=lambda running: self.set_property("updating", running),
+        )
         self.connect("items-changed", lambda *_: self.notify("n-items"))
 
     def __iter__(self) -> Iterator[V]:  # pyright: ignore[reportIncompatibleMethodOverride]
         return super().__iter__()  # pyright: ignore[reportReturnType]
 
+    def keys(self) -> KeysView[K]:
+        """Get a view of the keys of items in `self`."""
+        return self._items.keys()
+
     def do_get_item(self, position: int) -> V | None:
         """Get the item at `position`.
 
         If `position` is greater than the number of items in `self`, `None` is returned.
         """
         try:
-            return tuple(self._items.values())[position]
+            return self._values[position]
         except IndexError:
             return None
 
@@ -109,10 +155,14 @@ class DictStore[K, V](GObject.Object, Gio.ListModel):  # pyright: ignore[reportI
         return len(self._items)
 
     async def update(self):
-        """Update `self` asynchronously."""
-        self.updating = True
-        await self._update()
-        self.updating = False
+        """Update `self` asynchronously.
+
+        Only one update runs at a time. Calls made while one is running
+        wait for a single extra update once it finishes.
+        Each update starts after `UPDATE_DEBOUNCE` seconds,
+        so that bursts of calls collapse into one. See `scheduler.SingleFlight`.
+        """
+        await self._flight.run()
 
     def add(self, item: Any) -> V:  # noqa: ANN401
         """Manually add `item` to `self`.
@@ -128,7 +178,12 @@ class DictStore[K, V](GObject.Object, Gio.ListModel):  # pyright: ignore[reportI
             return value
 
         value = self._items[key] = self.__class__.default_factory(item)
-        self.items_changed(len(self._items) - 1, 0, 1)
+
+        index = len(self._keys)
+        self._positions[key] = index + len(self._removed)
+        self._keys.append(key)
+        self._values.append(value)
+        self.items_changed(index, 0, 1)
         return value
 
     def remove(self, item: K):
@@ -137,10 +192,65 @@ class DictStore[K, V](GObject.Object, Gio.ListModel):  # pyright: ignore[reportI
         Note that this will not remove it from the underlying data store,
         only the client's version. It may be added back after `update()` is called.
         """
-        index = list(self._items.keys()).index(item)
-        self._items.pop(item)
+        if item not in self._items:
+            e = f"{item} is not in the store"
+            raise ValueError(e)
+
+        position = self._positions.pop(item)
+        index = position - bisect_left(self._removed, position)
+        del self._items[item], self._keys[index], self._values[index]
+
+        insort(self._removed, position)
+        if len(self._removed) > REINDEX_AFTER:
+            self._reindex()
+
         self.items_changed(index, 1, 0)
 
+    def retain(self, keys: AbstractSet[K]):
+        """Remove all items from `self` with keys not in `keys`.
+
+        Unlike calling `remove()` for each item, this is a single pass over `self`.
+        Each run of adjacent removed items is a single change, unless there
+        are more than `RETAIN_MAX_RUNS`. Then, everything after the first
+        removed item is replaced in one change.
+
+        Note that this will not remove items from the underlying data store,
+        only the client's version.
+        """
+        runs = list[list[int]]()  # Start and length of each run of removed items
+        for index, key in enumerate(self._keys):
+            if key in keys:
+                continue
+
+            if runs and (sum(runs[-1]) == index):
+                runs[-1][1] += 1
+            else:
+                runs.append([index, 1])
+
+        if len(runs) > RETAIN_MAX_RUNS:
+            # Replace everything after the first removed item at once instead
+            start, removed = runs[0][0], len(self._keys) - runs[0][0]
+            for key in self._keys[start:]:
+                if key not in keys:
+                    del self._items[key]
+
+            self._keys[start:] = [k for k in self._keys[start:] if k in self._items]
+            self._values[start:] = [self._items[k] for k in self._keys[start:]]
+            self._reindex()
+            self.items_changed(start, removed, len(self._keys) - start)
+            return
+
+        # Backwards, so positions of the remaining runs stay the same
+        for start, n in reversed(runs):
+            for key in self._keys[start : start + n]:
+                del self._items[key]
+
+            del self._keys[start : start + n], self._values[start : start + n]
+            self.items_changed(start, n, 0)
+
+        if runs:
+            self._reindex()
+
     def clear(self):
         """Remove all items from `self`.
 
@@ -150,8 +260,16 @@ class DictStore[K, V](GObject.Object, Gio.ListModel):  # pyright: ignore[reportI
         """
         n = len(self._items)
         self._items.clear()
+        self._keys.clear()
+        self._values.clear()
+        self._positions.clear()
+        self._removed.clear()
         self.items_changed(0, n, 0)
 
+    def _reindex(self):
+        self._positions = dict(zip(self._keys, count(), strict=False))
+        self._removed.clear()
+
     @abstractmethod
     async def _update(self): ...
 
@@ -164,40 +282,69 @@ class ProfileStore(DictStore[Address, Profile]):
     _item_type = Profile
 
     async def update_profiles(self, *, trust_images: bool = True):
-        """Update the profiles of contacts in the user's address book.
+        """Update the profiles of contacts in `self`.
+
+        Visible profiles are refreshed first, then the least recently refreshed ones.
+        Profiles refreshed in the last `PROFILE_MAX_AGE` seconds are skipped,
+        those that could not be fetched are retried on the next call.
+        At most `PROFILE_BATCH` profiles are refreshed per call,
+        by `PROFILE_WORKERS` concurrent workers.
 
         If `trust_images` is set to `False`, profile images will not be loaded.
         """
-        for address in (Address(contact.address) for contact in self):
-            tasks.create(self._update_profile(address))
-            if trust_images:
-                tasks.create(self._update_profile_image(address))
+        now = monotonic()
+
+        def is_stale(address: Address) -> bool:
+            last = _refreshed.get((address, trust_images))
+            return (last is None) or (now - last >= PROFILE_MAX_AGE)
+
+        stale = sorted(
+            filter(is_stale, (Address(contact.address) for contact in self)),
+            key=lambda a: (visible.rank(a), _refreshed.get((a, trust_images), 0)),
+        )[:PROFILE_BATCH]
+
+        first = {a for a in stale if (a, trust_images) not in _refreshed}
+
+        async def work():
+            for address in pending:
+                fetched = await self._update_profile(
+                    address, load_cached=address in first
+                )
+                if trust_images:
+                    await self._update_profile_image(
+                        address, load_cached=address in first
+                    )
+
+                if fetched:
+                    _refreshed[address, trust_images] = monotonic()
+
+        pending = iter(stale)  # Shared by all workers
+        await asyncio.gather(*(work() for _ in range(PROFILE_WORKERS)))
 
     @classmethod
-    async def _update_profile(cls, address: Address):
+    async def _update_profile(cls, address: Address, *, load_cached: bool) -> bool:
         profile = cls.default_factory(address)
-        profile.set_from_profile(core_profile.cached(address))
-        profile.set_from_profile(await core_profile.fetch(address))
+        if load_cached:
+            profile.set_from_profile(core_profile.cached(address))
+
+        profile.set_from_profile(fetched := await core_profile.fetch(address))
+        return fetched is not None
 
     @classmethod
-    async def _update_profile_image(cls, address: Address):
+    async def _update_profile_image(cls, address: Address, *, load_cached: bool):
         profile = cls.default_factory(address)
+        cached = core_profile.cached_image(address)
 
-        with suppress(GLib.Error):
-            profile.image = (
-                Gdk.Texture.new_from_bytes(GLib.Bytes.new(image))
-                if (image := core_profile.cached_image(address))
-                else None
-            )
+        if load_cached:
+            profile.image = await images.decode(cached)
 
-        try:
-            profile.image = (
-                Gdk.Texture.new_from_bytes(GLib.Bytes.new(image))
-                if (image := await core_profile.fetch_image(address))
-                else None
-            )
-        except GLib.Error:
-            profile.image = None
+        # The cached image is already shown, so there is nothing to decode
+        if ((image := await core_profile.fetch_image(address)) == cached) and (
+            profile.image or (not image)
+        ):
+            return
+
+        profile.image = await images.decode(image)
 
 
 class _AddressBook(ProfileStore):
@@ -205,16 +352,16 @@ class _AddressBook(ProfileStore):
         """Add `address` to the user's address book."""
         self.add(address).contact_request = False
 
-        tasks.create(self.update_profiles())
-        tasks.create(broadcasts.update())
-        tasks.create(inbox.update())
+        tasks.create(self.update_profiles(), group=tasks.SYNC)
+        tasks.create(broadcasts.update(), group=tasks.SYNC)
+        tasks.create(inbox.update(), group=tasks.SYNC)
 
         try:
             await contacts.new(address, receive_broadcasts=receive_broadcasts)
         except WriteError:
             self.remove(address)
-            tasks.create(broadcasts.update())
-            tasks.create(inbox.update())
+            tasks.create(broadcasts.update(), group=tasks.SYNC)
+            tasks.create(inbox.update(), group=tasks.SYNC)
 
             app.notifier.send(_("Failed to add contact"))
             raise
@@ -222,15 +369,21 @@ class _AddressBook(ProfileStore):
     async def delete(self, address: Address):
         """Delete `address` from the user's address book."""
         self.remove(address)
-        tasks.create(broadcasts.update())
-        tasks.create(inbox.update())
+
+        # Hide their broadcasts right away instead of after the update
+        for msg in messages.from_author(address):
+            if broadcasts.get(msg.unique_id):
+                broadcasts.remove(msg.unique_id)
+
+        tasks.create(broadcasts.update(), group=tasks.SYNC)
+        tasks.create(inbox.update(), group=tasks.SYNC)
 
         try:
             await contacts.delete(address)
         except WriteError:
             self.add(address)
-            tasks.create(broadcasts.update())
-            tasks.create(inbox.update())
+            tasks.create(broadcasts.update(), group=tasks.SYNC)
+            tasks.create(inbox.update(), group=tasks.SYNC)
 
             app.notifier.send(_("Failed to remove contact"))
             raise
@@ -243,9 +396,7 @@ class _AddressBook(ProfileStore):
             # TODO: Test if this works
             self.add(address).set_receives_broadcasts(receives_broadcasts)
 
-        for address in self._items.copy():
-            if address not in addresses:
-                self.remove(address)
+        self.retain(addresses)
 
 
 address_book = _AddressBook()
@@ -267,7 +418,7 @@ class _ContactRequests(ProfileStore):
                 request.contact_request = False
                 self.remove(request.address)
 
-        tasks.create(self.update_profiles(trust_images=False))
+        tasks.create(self.update_profiles(trust_images=False), group=tasks.SYNC)
 
 
 contact_requests = _ContactRequests()
@@ -296,49 +447,95 @@ class MessageStore(DictStore[str, Message]):
     default_factory = Message
 
     _item_type = Message
+    _registered = True
 
     def get(self, ident: str) -> Message | None:
         """Get the message with `ident` or `None` if it is not in `self`."""
         return self._items.get(ident)
 
+    def add(self, item: Any) -> Message:  # noqa: ANN401
+        """Manually add `item` to `self`, registering it in `messages`.
+
+        See `DictStore.add()`.
+        """
+        value = super().add(item)
+        if self._registered:
+            messages.add(self, value)
+
+        return value
+
+    def remove(self, item: str):
+        """Remove `item` from `self`, unregistering it from `messages`.
+
+        See `DictStore.remove()`.
+        """
+        if self._registered:
+            messages.discard(self, item)
+
+        super().remove(item)
+
+    def retain(self, keys: AbstractSet[str]):
+        """Remove items with keys not in `keys`, unregistering them from `messages`.
+
+        See `DictStore.retain()`.
+        """
+        if self._registered:
+            for ident in self._items.keys() - keys:
+                messages.discard(self, ident)
+
+        super().retain(keys)
+
+    def clear(self):
+        """Remove all items from `self`, unregistering them from `messages`.
+
+        See `DictStore.clear()`.
+        """
+        if self._registered:
+            for ident in self._items:
+                messages.discard(self, ident)
+
+        super().clear()
+
     async def _update(self):
         idents = set[str]()
 
         async for msg in self._fetch():
-            idents.add(self.add(msg).unique_id)
+            # Parents are yielded again as their children arrive
+            if msg.children and (item := self.get(self.__class__.key_for(msg))):
+                item.set_from_message(msg)
+            else:
+                item = self.add(msg)
 
-        for ident in self._items.copy():
-            if ident not in idents:
-                self.remove(ident)
+            idents.add(item.unique_id)
+
+        self.retain(idents)
 
     @abstractmethod
     def _fetch(self) -> AsyncGenerator[model.Message]: ...
 
     async def _process_messages(
-        self, futures: AsyncIterable[Iterable[model.Message]]
+        self, streams: Iterable[AsyncIterable[model.Message]]
     ) -> AsyncGenerator[model.Message]:
-        unread = set[str]()
-        async for msgs in futures:
-            current_unread = settings.get_strv("unread-messages")
-
-            for msg in msgs:
-                key = MessageStore.key_for(msg)
-                if msg.new:
-                    unread.add(key)
-                elif key in current_unread:
-                    msg.new = True
+        new = set[str]()
+        async for msg in _merge(streams):
+            key = MessageStore.key_for(msg)
+            if msg.new:
+                new.add(key)
+            elif key in unread:
+                msg.new = True
 
-                yield msg
+            yield msg
 
-        settings_add("unread-messages", *unread)
+        unread.add(*new)
 
 
 class _BroadcastStore(MessageStore):
     async def _fetch(self) -> AsyncGenerator[model.Message]:
         async for msg in self._process_messages(
-            await core_messages.fetch_broadcasts(
+            core_messages.fetch_broadcasts(
                 address := Address(contact.address),
                 exclude=_exclude(address),
+                bodies=settings.get_boolean("sync-bodies"),
             )
             for contact in address_book
             if contact.receive_broadcasts
@@ -372,10 +569,15 @@ class _InboxStore(MessageStore):
 
         async for msg in self._process_messages(
             (
-                await core_messages.fetch_link_messages(
-                    address, exclude=_exclude(address)
+                core_messages.fetch_link_messages(
+                    address,
+                    exclude=_exclude(address),
+                    bodies=settings.get_boolean("sync-bodies"),
+                )
+                for address in chain(
+                    known_notifiers,
+                    sorted(other_contacts, key=visible.rank),
                 )
-                for address in chain(known_notifiers, other_contacts)
             ),
         ):
             yield msg
@@ -384,11 +586,75 @@ class _InboxStore(MessageStore):
 inbox = _InboxStore()
 
 
+class _SharedFetch[T]:
+    """Share a single in-progress fetch between multiple consumers.
+
+    Consumers that join while a fetch is in progress get the items
+    fetched so far, then the rest as they arrive.
+    Once a fetch is finished, the next consumer starts a new one.
+    """
+
+    def __init__(self, fetch: Callable[[], AsyncIterable[T]]):
+        self._fetch = fetch
+        self._items = list[T]()
+        self._task: asyncio.Task[None] | None = None
+        self._arrived = asyncio.Event()
+
+    async def stream(self) -> AsyncGenerator[T]:
+        """Yield the items of the current fetch, starting one if needed."""
+        if (not self._task) or self._task.done():
+            self._items = []
+            self._task = tasks.create(self._run(self._items), group=tasks.SYNC)
+
+        items, task, index = self._items, self._task, 0
+        while True:
+            while index < len(items):
+                yield items[index]
+                index += 1
+
+            if task.done():
+                task.result()
+                return
+
+            await self._arrived.wait()
+
+    def clear(self):
+        """Forget the current fetch, cancelling it if it is still in progress."""
+        if self._task:
+            self._task.cancel()
+
+        self._task, self._items = None, []
+
+    async def _run(self, items: list[T]):
+        try:
+            async for item in self._fetch():
+                items.append(item)
+                self._notify()
+        finally:
+            self._notify()
+
+    def _notify(self):
+        # Wakes up all current waiters
+        self._arrived.set()
+        self._arrived.clear()
+
+
+_home = _SharedFetch(
+    lambda: core_messages.fetch_home(
+        _exclude(client.user.address),
+        bodies=settings.get_boolean("sync-bodies"),
+    )
+)
+
+
 class _SentStore(MessageStore):
     default_factory = partial(Message, can_mark_unread=False)
 
     async def _fetch(self) -> AsyncGenerator[model.Message]:
-        for msg in await core_messages.fetch_sent(_exclude(client.user.address)):
+        async for msg, _remote in _home.stream():
+            if msg.ident in _exclude(client.user.address):
+                continue
+
             msg.new = False  # New sent messages should be marked read automatically
             yield msg
 
@@ -397,7 +663,6 @@ sent = _SentStore()
 
 
 class _OutboxStore(MessageStore):
-    filter = Gtk.CustomFilter.new(lambda msg: msg.unique_id not in outbox._items)
     default_factory = partial(
         Message,
         can_discard=True,
@@ -405,22 +670,11 @@ class _OutboxStore(MessageStore):
         can_mark_unread=False,
     )
 
-    def __init__(self, **kwargs: Any):
-        super().__init__(**kwargs)
-
-        self.connect("items-changed", self._on_items_changed)
-
-    def _on_items_changed(self, _list, _pos, removed: int, added: int):
-        self.filter.changed(
-            Gtk.FilterChange.MORE_STRICT
-            if added and (not removed)
-            else Gtk.FilterChange.LESS_STRICT
-            if removed and (not added)
-            else Gtk.FilterChange.DIFFERENT
-        )
-
     async def _fetch(self) -> AsyncGenerator[model.Message]:
-        for msg in await core_messages.fetch_outbox():
+        async for msg, remote in _home.stream():
+            if not remote:
+                continue
+
             msg.new = False  # New outbox messages should be marked read automatically
             yield msg
 
@@ -429,6 +683,9 @@ outbox = _OutboxStore()
 
 
 class _DraftStore(MessageStore):
+    # Drafts are not sent yet, so they are not part of any thread
+    _registered = False
+
     def save(
         self,
         ident: str | None = None,
@@ -462,7 +719,7 @@ class _DraftStore(MessageStore):
 
         core_drafts.save(draft(ident=ident) if ident else draft())
         self.clear()  # TODO
-        tasks.create(self.update())
+        tasks.create(self.update(), group=tasks.SYNC)
 
     def delete(self, ident: str):
         """Delete a draft saved using `save()`."""
@@ -483,51 +740,44 @@ drafts = _DraftStore()
 
 
 async def sync(*, periodic: bool = False):
-    """Populate the app's content by fetching the user's data."""
-    app.notifier.syncing = True
+    """Populate the app's content by fetching the user's data.
 
+    If `periodic` is set, each folder is then kept in sync on its own schedule.
+    See `scheduler.Job`.
+    """
     if periodic:
-        interval = settings.get_uint("sync-interval")
-        GLib.timeout_add_seconds(interval or 60, tasks.create, sync(periodic=True))
+        for job in _jobs:
+            job.schedule()
 
-        # The user chose manual sync, check again in a minute
-        if not interval:
+        # The user chose manual sync
+        if not settings.get_uint("sync-interval"):
             return
 
     # Assume that nobody is logged in, skip sync for now
     if not settings.get_string("address"):
         return
 
+    deleted.compact()
+    core_profile.prune_caches()
+
     broadcasts.updating = True
     inbox.updating = True
     outbox.updating = True
     sent.updating = True
 
+    # Messages are fetched based on the address book, so update it first
     await address_book.update()
-
-    task_set: set[Coroutine[Any, Any, Any]] = {
-        profile.refresh(),
-        address_book.update_profiles(),
-        contact_requests.update(),
-        broadcasts.update(),
-        inbox.update(),
-        outbox.update(),
-        sent.update(),
+    await asyncio.gather(
         drafts.update(),
-    }
-
-    def done(task: Coroutine[Any, Any, Any]):
-        task_set.discard(task)
-        if not task_set:
-            app.notifier.syncing = False
+        *(job.run() for job in _jobs),
+        return_exceptions=True,
+    )
 
-    for task in task_set:
-        tasks.create(task, lambda _, t=task: done(t))
 
-    settings.connect(
-        "changed::contact-requests",
-        lambda *_: tasks.create(contact_requests.update()),
-    )
+def reset():
+    """Forget in-progress fetches and refresh times, for example after logging out."""
+    _home.clear()
+    _refreshed.clear()
 
 
 def empty_trash():
@@ -552,9 +802,161 @@ def settings_discard(key: str, *items: str):
     settings.set_strv(key, value)
 
 
-def _exclude(address: Address) -> tuple[str, ...]:
-    return tuple(
-        split[1]
-        for ident in settings.get_strv("deleted-messages")
-        if (split := ident.split(" "))[0] == address.host_part
+async def _update_profiles() -> bool:
+    if not settings.get_string("address"):
+        return False
+
+    await address_book.update()
+    await asyncio.gather(
+        profile.refresh(),
+        address_book.update_profiles(),
+        contact_requests.update(),
     )
+    return False
+
+
+async def _update_messages(store: MessageStore) -> bool:
+    if not settings.get_string("address"):
+        return False
+
+    before = set(store.keys())
+    await store.update()
+
+    if (changed := before != store.keys()) and (
+        not settings.get_boolean("sync-bodies")
+    ):
+        tasks.create(_prefetch.run(), group=tasks.SYNC)
+
+    return changed
+
+
+async def _prefetch_bodies() -> bool:
+    """Download the bodies of the newest messages synced without one.
+
+    Stops once `PREFETCH_BUDGET` bytes have been downloaded.
+    Bodies of unknown size are counted as `PREFETCH_UNKNOWN_SIZE` bytes.
+    Returns whether any bodies were downloaded.
+    """
+    budget, loaded = PREFETCH_BUDGET, False
+    for msg in sorted(
+        chain(inbox, broadcasts, sent, outbox),
+        key=lambda msg: (visible.rank(msg.unique_id), -msg.date),
+    ):
+        if (size := msg.pending_body_size) is None:
+            continue
+
+        if (budget := budget - (size or PREFETCH_UNKNOWN_SIZE)) < 0:
+            break
+
+        await msg.load_body()
+        loaded = True
+
+    return loaded
+
+
+async def _load_visible_body(msg: Message):
+    # Rows that are scrolled past quickly are hidden again before anything is fetched
+    await asyncio.sleep(VISIBLE_BODY_DELAY)
+    await msg.load_body()
+
+
+def _on_shown(_visible: Visibility, key: str):
+    for folder in inbox, broadcasts, sent, outbox:
+        if msg := folder.get(key):
+            break
+    else:
+        return
+
+    if msg.body_loaded:
+        return
+
+    _visible_loads[key] = task = tasks.create(_load_visible_body(msg), group=tasks.UI)
+    task.add_done_callback(
+        lambda task: (
+            _visible_loads.pop(key) if _visible_loads.get(key) is task else None
+        )
+    )
+
+
+def _on_hidden(_visible: Visibility, key: str):
+    if task := _visible_loads.pop(key, None):
+        task.cancel()
+
+
+def _exclude(address: Address) -> AbstractSet[str]:
+    return deleted.exclude(address.host_part)
+
+
+async def _merge[T](iterables: Iterable[AsyncIterable[T]]) -> AsyncGenerator[T]:
+    """Yield items from all `iterables` concurrently, in the order they arrive.
+
+    At most `MERGE_WORKERS` iterables are consumed at once,
+    in tasks of the same group as the caller. See `tasks.create()`.
+    """
+    queue = asyncio.Queue[tuple[T] | None]()
+
+    async def work():
+        try:
+            for iterable in pending:
+                await tasks.checkpoint()
+                async for item in iterable:
+                    await queue.put((item,))
+        finally:
+            await queue.put(None)
+
+    pending = iter(iterables)  # Shared by all workers
+    running = [tasks.create(work()) for _ in range(MERGE_WORKERS)]
+
+    try:
+        remaining = len(running)
+        while remaining:
+            if (item := await queue.get()) is None:
+                remaining -= 1
+                continue
+
+            yield item[0]
+
+        await asyncio.gather(*running)
+
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def _sync_interval() -> int:
+    return settings.get_uint("sync-interval")
+
+
+_profiles_job = Job(_update_profiles, _sync_interval, 10, max_factor=1)
+_jobs = (
+    _profiles_job,
+    # New mail is found through notifications, so they are polled at a fixed interval
+    Job(partial(_update_messages, inbox), _sync_interval, max_factor=1),
+    Job(partial(_update_messages, broadcasts), _sync_interval, 2),
+    Job(partial(_update_messages, outbox), _sync_interval, 2),
+    Job(partial(_update_messages, sent), _sync_interval, 4),
+)
+_prefetch = Job(_prefetch_bodies, lambda: 0)
+
+
+def _on_running_changed(*_args):
+    app.notifier.syncing = any(job.running for job in _jobs)
+
+
+def _on_sync_interval_changed(*_args):
+    for job in _jobs:
+        job.schedule()
+
+
+for _job in _jobs:
+    _job.connect("notify::running", _on_running_changed)
+
+settings.connect("changed::sync-interval", _on_sync_interval_changed)
+settings.connect(
+    "changed::contact-requests",
+    lambda *_: tasks.create(contact_requests.update(), group=tasks.SYNC),
+)
+
+_visible_loads = dict[str, asyncio.Task[Any]]()
+visible.connect("shown", _on_shown)
+visible.connect("hidden", _on_hidden)
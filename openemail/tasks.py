@@ -4,36 +4,116 @@
 # SPDX-FileContributor: kramo
 # SPDX-FileContributor: Jamie Gravendeel
 
+from asyncio import CancelledError, Event, Task, current_task, wait_for
+from collections import Counter, defaultdict
 from collections.abc import Callable, Coroutine
+from contextlib import suppress
+from contextvars import ContextVar
 from functools import wraps
-from typing import TYPE_CHECKING, Any, cast
+from time import monotonic
+from typing import Any, NamedTuple, cast
 
 from gi._gtktemplate import CallThing
 from gi.repository import Gio, Gtk
 
-if TYPE_CHECKING:
-    from asyncio import Task
+SYNC, SEND, UI = "sync", "send", "ui"
+BACKGROUND = frozenset({SYNC})
+MAX_PREEMPTION = 2
+
+
+class Stats(NamedTuple):
+    """Live metrics of a task group."""
+
+    running: int
+    durations: tuple[float, ...]
+    finished: int
+    total_time: float
+
+
+_group = ContextVar("group", default=UI)
+_tasks = defaultdict[str, set[Task[Any]]](set)
+_started = dict[Task[Any], tuple[str, float]]()
+_running = Counter[str]()
+_finished = Counter[str]()
+_total_time = defaultdict[str, float](float)
+_idle = Event()
+_idle.set()
 
 
 def create(
     coro: Coroutine[Any, Any, Any],
     callback: Callable[[bool], Any] | None = None,
-):
-    """Execute a coroutine in a task.
+    *,
+    group: str | None = None,
+) -> Task[Any]:
+    """Execute a coroutine in a task, supervised as part of `group`.
+
+    `group` defaults to the group of the calling task, or `UI` outside of one.
 
     Calls `callback` on finish with `True` if no exceptions were raised
-    and `False` otherwise.
+    and `False` otherwise, including if the task was cancelled.
+
+    Tasks in `BACKGROUND` groups yield to the others, see `checkpoint()`.
     """
     if not (app := Gio.Application.get_default()):
         e = "tasks.create() called before Application finished initializing"
         raise RuntimeError(e)
 
-    task = cast("Task[Any]", app.create_asyncio_task(coro))  # pyright: ignore[reportAttributeAccessIssue]
-    task.add_done_callback(
-        lambda task: callback(not task.exception()) if callback else None
+    group = group or _group.get()
+    task = cast("Task[Any]", app.create_asyncio_task(_supervise(coro, group)))  # pyright: ignore[reportAttributeAccessIssue]
+
+    _tasks[group].add(task)
+    task.add_done_callback(_tasks[group].discard)
+    if callback:
+        task.add_done_callback(
+            lambda task: callback(not (task.cancelled() or task.exception()))
+        )
+
+    return task
+
+
+def cancel(group: str):
+    """Cancel all tasks in `group`, including ones that have not started yet.
+
+    The calling task is not cancelled, so that it can finish what it is doing.
+    """
+    current = None
+    with suppress(RuntimeError):  # Not called from a task
+        current = current_task()
+
+    for task in tuple(_tasks[group]):
+        if task is not current:
+            task.cancel()
+
+
+def stats(group: str) -> Stats:
+    """Get live metrics of `group`.
+
+    `durations` are the seconds each running task has been running for.
+    `total_time` is the number of seconds spent on finished tasks.
+    """
+    now = monotonic()
+    return Stats(
+        _running[group],
+        tuple(now - start for g, start in _started.values() if g == group),
+        _finished[group],
+        _total_time[group],
     )
 
 
+async def checkpoint():
+    """Wait for tasks outside of `BACKGROUND` groups to finish.
+
+    Only waits if called from a task in a `BACKGROUND` group,
+    and for at most `MAX_PREEMPTION` seconds.
+    """
+    if (_group.get() not in BACKGROUND) or _idle.is_set():
+        return
+
+    with suppress(TimeoutError):
+        await wait_for(_idle.wait(), MAX_PREEMPTION)
+
+
 def callback[**P](func: Callable[P, Coroutine[Any, Any, Any]]) -> CallThing:
     """Create an async `Gtk.Template.Callback`."""
 
@@ -43,3 +123,35 @@ def callback[**P](func: Callable[P, Coroutine[Any, Any, Any]]) -> CallThing:
         create(func(*args, **kwargs))
 
     return wrapper
+
+
+async def _supervise(coro: Coroutine[Any, Any, Any], group: str) -> Any:  # noqa: ANN401
+    _group.set(group)
+
+    try:
+        await checkpoint()
+    except CancelledError:
+        coro.close()
+        raise
+
+    task, start = cast("Task[Any]", current_task()), monotonic()
+    _started[task] = group, start
+    _running[group] += 1
+    _update_idle()
+
+    try:
+        return await coro
+
+    finally:
+        del _started[task]
+        _running[group] -= 1
+        _finished[group] += 1
+        _total_time[group] += monotonic() - start
+        _update_idle()
+
+
+def _update_idle():
+    if any(n for group, n in _running.items() if group not in BACKGROUND):
+        _idle.clear()
+    else:
+        _idle.set()
@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# SPDX-FileCopyrightText: Copyright 2025 Mercata Sagl
+# SPDX-FileCopyrightText: Copyright 2025 OpenEmail SA
+# SPDX-FileContributor: kramo
+
+from collections import Counter
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from gi.repository import GObject, Gtk
+
+
+class Visibility(GObject.Object):
+    """Tracks which items are currently visible in the UI, as hints for fetching.
+
+    Items are identified by keys, such as message unique IDs or addresses.
+    Keys are counted, so an item stays visible as long as any widget shows it.
+
+    `Visibility::shown` and `Visibility::hidden` are emitted
+    with a key once it becomes visible or stops being visible respectively.
+    """
+
+    __gtype_name__ = __qualname__
+
+    _shown = GObject.Signal("shown", arg_types=(str,))
+    _hidden = GObject.Signal("hidden", arg_types=(str,))
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+
+        self._keys = Counter[str]()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def rank(self, key: str) -> int:
+        """Get a sort key that orders visible items before others."""
+        return 0 if key in self._keys else 1
+
+    def show(self, *keys: str):
+        """Mark `keys` as shown by one more widget."""
+        for key in keys:
+            self._keys[key] += 1
+            if self._keys[key] == 1:
+                self.emit("shown", key)
+
+    def hide(self, *keys: str):
+        """Mark `keys` as shown by one less widget."""
+        for key in keys:
+            if key not in self._keys:
+                continue
+
+            self._keys[key] -= 1
+            if not self._keys[key]:
+                del self._keys[key]
+                self.emit("hidden", key)
+
+    def track(
+        self,
+        widget: Gtk.Widget,
+        property_name: str,
+        keys_for: Callable[[Any], Iterable[str]],
+    ):
+        """Keep the item in `widget.property_name` visible while `widget` is mapped.
+
+        `keys_for` gets the keys of an item. Empty keys are ignored.
+        """
+        shown: tuple[str, ...] = ()
+
+        def update(*_args):
+            nonlocal shown
+
+            item = widget.get_property(property_name)
+            keys = (
+                tuple(k for k in keys_for(item) if k)
+                if item and widget.get_mapped()
+                else ()
+            )
+            if keys == shown:
+                return
+
+            self.hide(*shown)
+            self.show(*keys)
+            shown = keys
+
+        widget.connect("map", update)
+        widget.connect("unmap", update)
+        widget.connect(f"notify::{property_name}", update)